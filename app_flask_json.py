@@ -4,30 +4,72 @@ Application RevisionCam avec Flask et JSON
 Remplace complètement SQLite par un fichier JSON unique
 """
 
+import hashlib
+import heapq
 import json
 import os
-from datetime import date, datetime, timedelta
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import wraps
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from dataclasses import dataclass
 
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, jsonify, make_response, request, send_from_directory
 from flask_cors import CORS
 
 # Import du gestionnaire JSON
 from json_manager import json_manager
+from archive_store import ColdArchive
+from response_cache import ResponseCache
+from storage_backend import RECORD_TABLES, date_in_range, iso_to_ordinal, load_day, load_minutes, ordinal_to_iso, today_ordinal, weekday
 
 app = Flask(__name__)
-CORS(app, origins=['https://revisioncam-1.onrender.com', 'http://localhost:8080', 'http://127.0.0.1:8080'])  # Enable CORS for all routes
+CORS(app, origins=['https://revisioncam-1.onrender.com', 'http://localhost:8080', 'http://127.0.0.1:8080'],
+     expose_headers=['ETag', 'X-Next-Cursor'])  # Enable CORS for all routes
 
 # Configuration
 FRONTEND_DIR = Path(__file__).parent / "frontend"
+REPLAN_WORKERS = int(os.environ.get('REVISIONCAM_REPLAN_WORKERS', os.cpu_count() or 1))
+# Archivage automatique des examens passés toutes les N heures (0 = seulement à la demande)
+ARCHIVE_INTERVAL_HOURS = float(os.environ.get('REVISIONCAM_ARCHIVE_INTERVAL_HOURS', '0'))
+DEFAULT_ARCHIVE_AFTER_DAYS = 30
+
+cold_archive = ColdArchive(os.environ.get('REVISIONCAM_ARCHIVE', 'revisioncam_archive.jsonl.gz'))
+_last_archive_run: Optional[float] = None
+# Entre dans chaque ETag : un nouveau déploiement (forme des réponses) les invalide tous
+ETAG_SALT = str(os.path.getmtime(__file__))
+# Tables (et configuration) dont dépendent les réponses mises en cache
+VERSIONED_TABLES = ('examens', 'cours', 'planning', 'scores', 'config')
+
+response_cache = ResponseCache(int(float(os.environ.get('REVISIONCAM_RESPONSE_CACHE_MB', '32')) * 1024 * 1024))
+
+@app.before_request
+def refresh_data():
+    """Intègre les écritures des autres workers avant de traiter la requête"""
+    json_manager.refresh()
+    archive_if_due()
+
+@app.after_request
+def invalidate_cached_responses(response):
+    """Libère les réponses en cache qui dépendent des tables modifiées par cette requête"""
+    if request.method in ('POST', 'PUT', 'DELETE'):
+        response_cache.invalidate_changed({table: json_manager.get_data_version(table) for table in VERSIONED_TABLES})
+    return response
 
 # Algorithm constants
 OFFSETS_TEMPLATE = [1, 3, 7, 14, 21, 30, 45, 60, 75, 90, 105, 120, 135]
 DURATION_FACTORS = [0.6, 0.5, 0.4, 0.35, 0.3, 0.25, 0.2, 0.15, 0.15, 0.12, 0.12, 0.1, 0.1]
+DAYS_OF_WEEK = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
 
-@dataclass
+# Paramètres dont dépend la génération du planning (les seconds seulement en placement selon la charge)
+REPLAN_PARAMS = ('duree_min', 'duree_max', 'revision_finale_jours', 'placement_tolerance_days')
+CAPACITY_PARAMS = ('max_revisions_per_day', 'min_gap_days')
+
+@dataclass(frozen=True)
 class PlanningParams:
     duree_min: int
     duree_max: int
@@ -36,14 +78,138 @@ class PlanningParams:
     revision_finale_jours: int = 7
     min_gap_days: int = 2
     bonus_ok_days: int = 2
+    placement_tolerance_days: int = 0
+
+@dataclass(frozen=True)
+class PlanningConfig:
+    """Configuration figée du planning : paramètres, disponibilités et barème"""
+    version: Any
+    params: PlanningParams
+    max_revisions_per_day: int
+    availability_map: Mapping[str, int]
+    # Minutes disponibles par jour de la semaine (0 = lundi), 0 si le jour n'est pas renseigné
+    weekday_minutes: Tuple[int, ...]
+    # Minutes utilisables par jour de la semaine pour la détection des conflits
+    daily_capacity: Tuple[int, ...]
+    # Nombre de révisions pour chaque indice de priorité (0 à 10)
+    revisions_by_indice: Tuple[int, ...]
+    
+    def nb_revisions(self, indice: Any) -> int:
+        """Nombre de révisions pour un indice (même bornage que le barème)"""
+        return self.revisions_by_indice[max(0, min(10, int(indice) if indice is not None else 5))]
 
 @dataclass
 class DayState:
     total_duration: int
     count: int
 
-def load_params() -> PlanningParams:
-    """Charge les paramètres depuis le JSON"""
+class OccupancyCalendar:
+    """Occupation du planning non 'Fait' par date, construite une fois par opération
+
+    Tient à jour la charge de chaque jour (`DayState`) et, pour chaque cours,
+    la date de ses révisions : la recherche de créneau n'a plus à relire
+    le planning pour chaque jour candidat. Les jours sont des ordinaux
+    (`date.toordinal()`).
+    """
+
+    def __init__(self, occupancy: List[tuple], params: PlanningParams,
+                 max_revisions_per_day: int, availability_map: Dict[str, int]):
+        self.params = params
+        self.max_revisions_per_day = max_revisions_per_day
+        # Minutes disponibles par jour de la semaine (0 = lundi)
+        self.weekday_minutes = [availability_map.get(jour, 0) for jour in DAYS_OF_WEEK]
+        self.days: Dict[int, DayState] = {}
+        self.course_dates: Dict[int, Dict[int, int]] = {}
+        for record_id, cours_id, _, day, duree in occupancy:
+            self._add(record_id, cours_id, day, duree)
+
+    @classmethod
+    def load(cls, params: PlanningParams, availability_map: Optional[Dict[str, int]] = None,
+             exclude_course: Optional[int] = None, exclude_exam: Optional[int] = None) -> 'OccupancyCalendar':
+        """Construit le calendrier à partir du planning en attente, hors éléments d'un cours ou d'un examen"""
+        occupancy = json_manager.get_pending_occupancy()
+        if exclude_course is not None or exclude_exam is not None:
+            occupancy = [row for row in occupancy
+                         if (exclude_course is None or row[1] != exclude_course)
+                         and (exclude_exam is None or row[2] != exclude_exam)]
+        if availability_map is None:
+            availability_map = get_availability_map()
+        return cls(occupancy, params, get_config().max_revisions_per_day, availability_map)
+
+    def _add(self, record_id: Optional[int], cours_id: Optional[int], ordinal: Optional[int], duree: int):
+        if ordinal is not None:
+            day = self.days.get(ordinal)
+            if day is None:
+                day = self.days[ordinal] = DayState(total_duration=0, count=0)
+            day.count += 1
+            day.total_duration += duree
+        if cours_id and record_id is not None:
+            self.course_dates.setdefault(cours_id, {})[record_id] = ordinal if ordinal is not None else iso_to_ordinal('2025-01-01')
+
+    def add(self, item: Dict):
+        """Ajoute un élément de planning à sa date"""
+        self._add(item.get('id'), item.get('cours_id'), load_day(item.get('date_finale')), load_minutes(item.get('duree')))
+
+    def remove(self, item: Dict):
+        """Retire un élément de planning de sa date"""
+        ordinal = load_day(item.get('date_finale'))
+        day = self.days.get(ordinal) if ordinal is not None else None
+        if day is not None:
+            day.count -= 1
+            day.total_duration -= load_minutes(item.get('duree'))
+        if item.get('cours_id'):
+            self.course_dates.get(item['cours_id'], {}).pop(item.get('id'), None)
+
+    def release_day(self, day: int):
+        """Vide la charge d'un jour avant d'y replacer ses éléments un par un"""
+        self.days[day] = DayState(total_duration=0, count=0)
+
+    def move(self, item: Dict, new_date: str):
+        """Déplace un élément (et met à jour sa date_finale)"""
+        self.remove(item)
+        item['date_finale'] = new_date
+        self.add(item)
+
+    def last_revision(self, cours_id: int, exclude_id: Optional[int] = None) -> Optional[int]:
+        """Jour (ordinal) de la révision la plus tardive d'un cours, hors élément exclu"""
+        return max((d for item_id, d in self.course_dates.get(cours_id, {}).items() if item_id != exclude_id), default=None)
+    
+    def fits(self, day: int, duree: int) -> bool:
+        """Indique si le jour (ordinal) peut accueillir une révision de cette durée"""
+        day_availability = self.weekday_minutes[weekday(day)]
+        if day_availability <= 0:
+            return False
+        state = self.days.get(day)
+        if state is None:
+            state = DayState(total_duration=0, count=0)
+        # Utiliser la disponibilité du jour ou la limite par défaut
+        max_daily_minutes = min(day_availability, self.params.default_daily_minutes)
+        return state.count < self.max_revisions_per_day and state.total_duration + duree <= max_daily_minutes
+
+    def nearest_slot(self, target: int, duree: int, first: int, last: int,
+                     course_dates: List[int]) -> Optional[int]:
+        """Jour le plus proche de `target` dans la fenêtre de tolérance (le plus tôt en cas d'égalité)
+
+        Le jour doit rester dans [first, last], avoir de la capacité et respecter
+        `min_gap_days` avec les autres révisions du cours (`course_dates`). Si
+        aucun jour n'a de capacité, le plus proche qui respecte seulement les
+        disponibilités et l'espacement est retenu.
+        """
+        for respect_load in (True, False):
+            for shift in range(self.params.placement_tolerance_days + 1):
+                for day in ((target - shift, target + shift) if shift else (target,)):
+                    if not first <= day <= last:
+                        continue
+                    if not (self.fits(day, duree) if respect_load else self.weekday_minutes[weekday(day)] > 0):
+                        continue
+                    if all(abs(day - other) >= self.params.min_gap_days for other in course_dates):
+                        return day
+        return None
+
+_config: Optional[PlanningConfig] = None
+
+def _build_config(version: Any) -> PlanningConfig:
+    """Construit la configuration à partir des données"""
     params_list = json_manager.get_parametres()
     
     # Convertir la liste en dictionnaire
@@ -55,107 +221,149 @@ def load_params() -> PlanningParams:
     elif isinstance(params_list, dict):
         params = params_list
     
-    return PlanningParams(
+    planning_params = PlanningParams(
         duree_min=params.get('duree_min', 30),
         duree_max=params.get('duree_max', 180),
         nb_max_par_j=params.get('max_revisions_per_day', 3),
         default_daily_minutes=480,
         revision_finale_jours=params.get('revision_finale_jours', 7),
-        min_gap_days=params.get('min_gap_days', 1),
-        bonus_ok_days=params.get('bonus_ok_days', 3)
+        min_gap_days=int(params.get('min_gap_days', 1)),
+        bonus_ok_days=params.get('bonus_ok_days', 3),
+        placement_tolerance_days=int(params.get('placement_tolerance_days', 0) or 0)
     )
-
-def get_availability_map() -> Dict[str, int]:
-    """Récupère la carte des disponibilités depuis le JSON"""
-    disponibilites = json_manager.get_disponibilites()
+    
     availability_map = {}
-    for dispo in disponibilites:
+    for dispo in json_manager.get_disponibilites():
         availability_map[dispo['jour']] = dispo['minutes']
-    return availability_map
+    default_minutes = planning_params.default_daily_minutes
+    
+    return PlanningConfig(
+        version=version,
+        params=planning_params,
+        max_revisions_per_day=params.get('max_revisions_per_day', 3),
+        availability_map=MappingProxyType(availability_map),
+        weekday_minutes=tuple(availability_map.get(jour, 0) for jour in DAYS_OF_WEEK),
+        daily_capacity=tuple(min(availability_map.get(jour, default_minutes), default_minutes) for jour in DAYS_OF_WEEK),
+        revisions_by_indice=tuple(json_manager.get_nb_revisions(indice) for indice in range(11))
+    )
+
+def get_config() -> PlanningConfig:
+    """Configuration du planning, reconstruite seulement quand paramètres, barème ou disponibilités changent"""
+    global _config
+    version = json_manager.get_config_version()
+    if _config is None or _config.version != version:
+        _config = _build_config(version)
+    return _config
+
+def load_params() -> PlanningParams:
+    """Charge les paramètres depuis le JSON"""
+    return get_config().params
+
+def get_availability_map() -> Mapping[str, int]:
+    """Récupère la carte des disponibilités depuis le JSON"""
+    return get_config().availability_map
 
 def get_nb_revisions(indice: int) -> int:
     """Récupère le nombre de révisions pour un indice donné"""
-    return json_manager.get_nb_revisions(indice)
+    return get_config().nb_revisions(indice)
 
 def init_data():
     """Initialise les données avec des exemples si nécessaire"""
-    stats = json_manager.get_stats()
-    
-    # Si pas d'examens, créer des données de test
-    if stats['examens'] == 0:
-        print("📝 Création des données de test...")
-        
-        # Créer des examens de test
-        examens_test = [
-            {"titre": "Examen S1", "date_exam": "2026-02-15"},
-            {"titre": "Examen S2", "date_exam": "2026-06-10"},
-            {"titre": "Rattrapages S1", "date_exam": "2026-03-15"},
-            {"titre": "Rattrapages S2", "date_exam": "2026-07-05"},
-            {"titre": "Partiels S1", "date_exam": "2026-01-20"},
-            {"titre": "Partiels S2", "date_exam": "2026-05-15"},
-            {"titre": "Examens finaux", "date_exam": "2026-08-20"},
-            {"titre": "Examens spéciaux", "date_exam": "2026-09-10"}
-        ]
+    with json_manager.transaction():
+        stats = json_manager.get_stats()
         
-        for exam_data in examens_test:
-            json_manager.create_examen(exam_data)
-        
-        # Créer des cours de test pour le premier examen
-        exam_id = 1
-        cours_test = [
-            {"titre": "Physio rein modifié", "type": "Majeur", "priorite_indice": 8, "examen_id": exam_id, "duree_estimee": 60, "date_j0": "2025-09-20"},
-            {"titre": "Anatomie coeur", "type": "Majeur", "priorite_indice": 7, "examen_id": exam_id, "duree_estimee": 90, "date_j0": "2025-09-20"},
-            {"titre": "Biochimie glucose", "type": "Majeur", "priorite_indice": 9, "examen_id": exam_id, "duree_estimee": 75, "date_j0": "2025-09-20"},
-            {"titre": "Pharmacologie", "type": "Mineur", "priorite_indice": 5, "examen_id": exam_id, "duree_estimee": 45, "date_j0": "2025-09-20"},
-            {"titre": "Pathologie", "type": "Majeur", "priorite_indice": 6, "examen_id": exam_id, "duree_estimee": 80, "date_j0": "2025-09-20"}
-        ]
-        
-        for cours_data in cours_test:
-            json_manager.create_cours(cours_data)
-        
-        # Générer le planning pour le premier examen
-        regenerate_planning_for_exam(exam_id)
-        
-        print(f"✅ {stats['examens']} examens et {len(cours_test)} cours créés avec planning")
+        # Si pas d'examens, créer des données de test
+        if stats['examens'] == 0:
+            print("📝 Création des données de test...")
+            
+            # Créer des examens de test
+            examens_test = [
+                {"titre": "Examen S1", "date_exam": "2026-02-15"},
+                {"titre": "Examen S2", "date_exam": "2026-06-10"},
+                {"titre": "Rattrapages S1", "date_exam": "2026-03-15"},
+                {"titre": "Rattrapages S2", "date_exam": "2026-07-05"},
+                {"titre": "Partiels S1", "date_exam": "2026-01-20"},
+                {"titre": "Partiels S2", "date_exam": "2026-05-15"},
+                {"titre": "Examens finaux", "date_exam": "2026-08-20"},
+                {"titre": "Examens spéciaux", "date_exam": "2026-09-10"}
+            ]
+            
+            for exam_data in examens_test:
+                json_manager.create_examen(exam_data)
+            
+            # Créer des cours de test pour le premier examen
+            exam_id = 1
+            cours_test = [
+                {"titre": "Physio rein modifié", "type": "Majeur", "priorite_indice": 8, "examen_id": exam_id, "duree_estimee": 60, "date_j0": "2025-09-20"},
+                {"titre": "Anatomie coeur", "type": "Majeur", "priorite_indice": 7, "examen_id": exam_id, "duree_estimee": 90, "date_j0": "2025-09-20"},
+                {"titre": "Biochimie glucose", "type": "Majeur", "priorite_indice": 9, "examen_id": exam_id, "duree_estimee": 75, "date_j0": "2025-09-20"},
+                {"titre": "Pharmacologie", "type": "Mineur", "priorite_indice": 5, "examen_id": exam_id, "duree_estimee": 45, "date_j0": "2025-09-20"},
+                {"titre": "Pathologie", "type": "Majeur", "priorite_indice": 6, "examen_id": exam_id, "duree_estimee": 80, "date_j0": "2025-09-20"}
+            ]
+            
+            for cours_data in cours_test:
+                json_manager.create_cours(cours_data)
+            
+            # Générer le planning pour le premier examen
+            regenerate_planning_for_exam(exam_id)
+            
+            print(f"✅ {stats['examens']} examens et {len(cours_test)} cours créés avec planning")
 
 # === ALGORITHME DE PLANNING ===
 
-def generate_planning_for_course(course: Dict, exam: Dict, params: PlanningParams, availability_map: Dict[str, int]) -> List[Dict]:
-    """Génère le planning pour un cours spécifique"""
-    exam_date = datetime.strptime(exam['date_exam'], '%Y-%m-%d').date()
+def generate_planning_for_course(course: Dict, exam: Dict, params: PlanningParams, availability_map: Dict[str, int],
+                                 calendar: Optional[OccupancyCalendar] = None) -> List[Dict]:
+    """Génère le planning pour un cours spécifique
+    
+    Avec `placement_tolerance_days` > 0, chaque jalon est placé sur le jour le
+    plus proche de sa date théorique (dans la tolérance) qui respecte les
+    disponibilités, `max_revisions_per_day` et `min_gap_days`. Le calendrier
+    d'occupation peut être partagé entre les cours d'un même examen.
+    """
+    exam_date = iso_to_ordinal(exam['date_exam'])
     
     # Si date_j0 n'est pas fournie, utiliser la date de création du cours ou une date par défaut
     if 'date_j0' in course and course['date_j0']:
-        course_start = datetime.strptime(course['date_j0'], '%Y-%m-%d').date()
+        course_start = iso_to_ordinal(course['date_j0'])
     else:
         # Utiliser la date actuelle comme date de début
-        course_start = datetime.now().date()
+        course_start = today_ordinal()
     
     nb_revisions = get_nb_revisions(course.get('priorite_indice', 5))
     planning_items = []
     
+    if params.placement_tolerance_days > 0 and calendar is None:
+        calendar = OccupancyCalendar.load(params, availability_map, exclude_course=course['id'])
+    placed_dates = []
+    
     # Calculer les dates des jalons
     for i in range(nb_revisions):
         if i == 0:
             # Premier jalon : J+1 après le cours
-            jalon_date = course_start + timedelta(days=1)
+            jalon_date = course_start + 1
         elif i == nb_revisions - 1:
             # Dernier jalon : révision finale obligatoire
-            jalon_date = exam_date - timedelta(days=params.revision_finale_jours)
+            jalon_date = exam_date - params.revision_finale_jours
         else:
             # Jalons intermédiaires basés sur la courbe d'oubli
             offset_days = OFFSETS_TEMPLATE[min(i, len(OFFSETS_TEMPLATE) - 1)]
-            jalon_date = course_start + timedelta(days=offset_days)
+            jalon_date = course_start + offset_days
         
         # Ajuster la durée selon le jalon
         duration_factor = DURATION_FACTORS[min(i, len(DURATION_FACTORS) - 1)]
         duration = max(params.duree_min, min(params.duree_max, int(float(course.get('duree_estimee', 30)) * duration_factor)))
         
+        if calendar is not None:
+            # Jour le plus proche avec de la place, sinon la date théorique
+            jalon_date = calendar.nearest_slot(jalon_date, duration, course_start + 1,
+                                               exam_date - 1, placed_dates) or jalon_date
+            placed_dates.append(jalon_date)
+        
         planning_item = {
             'cours_id': course['id'],
             'examen_id': exam['id'],
             'jalon': i + 1,
-            'date_finale': jalon_date.strftime('%Y-%m-%d'),
+            'date_finale': ordinal_to_iso(jalon_date),
             'duree': duration,
             'statut': 'À faire',
             'type': course['type'],
@@ -163,82 +371,225 @@ def generate_planning_for_course(course: Dict, exam: Dict, params: PlanningParam
         }
         
         planning_items.append(planning_item)
+        if calendar is not None:
+            calendar.add(planning_item)
+    
+    return planning_items
+
+def generate_planning_batch(courses: List[Dict], exams: Dict[int, Dict], params: PlanningParams,
+                            revisions_by_indice: Optional[List[int]] = None) -> List[Dict]:
+    """Génère en lot le planning de plusieurs cours, éventuellement de plusieurs examens
+    
+    Les cours sont convertis en colonnes (ordinal de début, ordinal de l'examen,
+    indice de priorité, durée estimée) ; dates et durées sont calculées jalon par
+    jalon sur ces colonnes, et les enregistrements ne sont construits qu'à la fin.
+    Le résultat est identique à `generate_planning_for_course` appelé pour chaque
+    cours (`exams` associe chaque `examen_id` à son examen). `revisions_by_indice`
+    (nombre de révisions pour les indices 0 à 10) évite de relire le barème.
+    """
+    if not courses:
+        return []
+    
+    # Colonnes par cours
+    today = today_ordinal()
+    course_exams = [exams[course['examen_id']] for course in courses]
+    start_ordinals = [iso_to_ordinal(course['date_j0']) if course.get('date_j0') else today for course in courses]
+    final_ordinals = [iso_to_ordinal(exam['date_exam']) - params.revision_finale_jours for exam in course_exams]
+    if revisions_by_indice is None:
+        revisions_by_indice = get_config().revisions_by_indice
+    nb_revisions = [revisions_by_indice[max(0, min(10, int(indice) if indice is not None else 5))]
+                    for indice in (course.get('priorite_indice', 5) for course in courses)]
+    estimated = [float(course.get('duree_estimee', 30)) for course in courses]
+    
+    # Dates (ordinaux) et durées, une colonne par jalon
+    date_columns = []
+    duration_columns = []
+    for i in range(max(nb_revisions)):
+        factor = DURATION_FACTORS[min(i, len(DURATION_FACTORS) - 1)]
+        if i == 0:
+            # Premier jalon : J+1 après le cours
+            dates = [start + 1 for start in start_ordinals]
+        else:
+            offset_days = OFFSETS_TEMPLATE[min(i, len(OFFSETS_TEMPLATE) - 1)]
+            # Dernier jalon : révision finale ; intermédiaires : courbe d'oubli
+            dates = [final if n == i + 1 else start + offset_days
+                     for start, final, n in zip(start_ordinals, final_ordinals, nb_revisions)]
+        date_columns.append(dates)
+        duration_columns.append([max(params.duree_min, min(params.duree_max, int(minutes * factor))) for minutes in estimated])
+    
+    # Construction des enregistrements
+    planning_items = []
+    for index, (course, exam, n) in enumerate(zip(courses, course_exams, nb_revisions)):
+        for i in range(n):
+            planning_items.append({
+                'cours_id': course['id'],
+                'examen_id': exam['id'],
+                'jalon': i + 1,
+                'date_finale': ordinal_to_iso(date_columns[i][index]),
+                'duree': duration_columns[i][index],
+                'statut': 'À faire',
+                'type': course['type'],
+                'priorite_indice': course['priorite_indice']
+            })
     
     return planning_items
 
-def regenerate_planning_for_exam(exam_id: int):
+def regenerate_planning_for_exam(exam_id: int) -> List[Dict]:
     """Régénère le planning pour un examen (préserve les statuts 'Fait')"""
     exam = json_manager.get_examen(exam_id)
     if not exam:
-        return
-    
-    # Supprimer seulement les éléments 'À faire'
-    json_manager.clear_planning_for_exam(exam_id, keep_status='Fait')
+        return []
     
     # Récupérer les cours de l'examen
     cours = json_manager.get_cours(exam_id)
-    if not cours:
-        return
     
     params = load_params()
     availability_map = get_availability_map()
     
+    # Placement selon la charge : calendrier partagé avec le planning des autres examens,
+    # les cours prioritaires choisissent leurs jours en premier
+    calendar = None
+    placement_order = cours
+    if params.placement_tolerance_days > 0:
+        calendar = OccupancyCalendar.load(params, availability_map, exclude_exam=exam_id)
+        placement_order = sorted(cours, key=lambda c: (c.get('type') != 'Majeur', -int(c.get('priorite_indice') or 0)))
+    
     # Générer le planning pour chaque cours
-    for course in cours:
-        planning_items = generate_planning_for_course(course, exam, params, availability_map)
-        for item in planning_items:
-            json_manager.create_planning_item(item)
+    if calendar is None:
+        planning_items = generate_planning_batch(cours, {exam_id: exam}, params)
+    else:
+        generated = {course['id']: generate_planning_for_course(course, exam, params, availability_map, calendar)
+                     for course in placement_order}
+        planning_items = []
+        for course in cours:
+            planning_items.extend(generated[course['id']])
+    
+    # Remplacer seulement les éléments 'À faire', en une seule écriture
+    return json_manager.replace_planning_for_exam(exam_id, planning_items, keep_status='Fait')
+
+def replan_course(cours_id: int) -> Dict:
+    """Replanifie un seul cours (préserve les statuts 'Fait')
+    
+    Les jalons générés sont comparés, jalon par jalon, aux éléments non 'Fait'
+    du cours : seuls ceux qui diffèrent sont mis à jour, les jalons en trop sont
+    supprimés et les nouveaux ajoutés. Le reste du planning de l'examen n'est
+    pas touché.
+    """
+    changes = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    with json_manager.transaction():
+        course = json_manager.get_cours_by_id(cours_id)
+        exam = json_manager.get_examen(course['examen_id']) if course else None
+        if not exam:
+            return changes
+        
+        planning_items = generate_planning_for_course(course, exam, load_params(), get_availability_map())
+        
+        # Éléments existants non 'Fait', par jalon
+        existing = {}
+        for item in json_manager.get_planning_by_course(cours_id):
+            if item.get('statut') != 'Fait':
+                existing.setdefault(item.get('jalon'), []).append(item)
+        
+        new_items = []
+        for planning_item in planning_items:
+            matches = existing.get(planning_item['jalon'])
+            if not matches:
+                new_items.append(planning_item)
+                continue
+            current = matches.pop(0)
+            if any(current.get(key) != value for key, value in planning_item.items()):
+                json_manager.update_planning_item(current['id'], planning_item)
+                changes['updated'] += 1
+            else:
+                changes['unchanged'] += 1
+        
+        for matches in existing.values():
+            for item in matches:
+                json_manager.delete_planning_item(item['id'])
+                changes['deleted'] += 1
+        
+        if new_items:
+            json_manager.create_planning_items(new_items)
+            changes['inserted'] = len(new_items)
+    
+    print(f"🔄 Planning du cours {cours_id}: {changes['inserted']} ajoutés, {changes['updated']} mis à jour, {changes['deleted']} supprimés")
+    return changes
+
+def _generate_exam_task(task: tuple) -> tuple:
+    """Génère le planning d'un examen à partir de données figées (exécuté dans le pool)"""
+    exam, courses, params, revisions_by_indice = task
+    started = time.perf_counter()
+    planning_items = generate_planning_batch(courses, {exam['id']: exam}, params, revisions_by_indice)
+    return exam['id'], planning_items, time.perf_counter() - started
+
+def replan_all_exams(workers: Optional[int] = None) -> Dict:
+    """Régénère le planning de tous les examens (préserve les statuts 'Fait') en une seule écriture
+    
+    Les examens étant indépendants, leur génération est répartie sur un
+    ProcessPoolExecutor à partir d'une copie figée des examens, des cours, des
+    paramètres et du barème. En placement selon la charge, les examens partagent
+    l'occupation des jours et sont donc régénérés à la suite.
+    """
+    started = time.perf_counter()
+    params = load_params()
+    workers = REPLAN_WORKERS if workers is None else workers
+    report = []
+    
+    with json_manager.transaction():
+        exams = json_manager.get_examens()
+        titles = {exam['id']: exam.get('titre') for exam in exams}
+        if params.placement_tolerance_days > 0:
+            workers = 1
+            for exam in exams:
+                exam_started = time.perf_counter()
+                planning_items = regenerate_planning_for_exam(exam['id'])
+                report.append((exam['id'], len(planning_items), time.perf_counter() - exam_started))
+        else:
+            revisions_by_indice = get_config().revisions_by_indice
+            tasks = [(exam, json_manager.get_cours(exam['id']), params, revisions_by_indice) for exam in exams]
+            workers = max(1, min(workers, len(tasks)))
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_generate_exam_task, tasks))
+            else:
+                results = [_generate_exam_task(task) for task in tasks]
+            for exam_id, planning_items, elapsed in results:
+                json_manager.replace_planning_for_exam(exam_id, planning_items, keep_status='Fait')
+                report.append((exam_id, len(planning_items), elapsed))
+    
+    total_items = sum(count for _, count, _ in report)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(f"🔁 Replanification de {len(report)} examens ({total_items} révisions) en {elapsed_ms} ms sur {workers} processus")
+    return {
+        'examens': [{'examen_id': exam_id, 'titre': titles.get(exam_id), 'nb_revisions': count,
+                     'duree_ms': round(elapsed * 1000, 1)} for exam_id, count, elapsed in report],
+        'total_revisions': total_items,
+        'duree_totale_ms': elapsed_ms,
+        'workers': workers
+    }
 
 def detect_conflicts(params: PlanningParams) -> List[Dict]:
     """Détecte les conflits de planning"""
-    # Récupérer max_revisions_per_day depuis les paramètres
-    parametres = json_manager.get_parametres()
-    max_revisions_per_day = parametres.get('max_revisions_per_day', 3)
-    
-    # Récupérer les disponibilités hebdomadaires
-    availability_map = get_availability_map()
+    config = get_config()
+    max_revisions_per_day = config.max_revisions_per_day
+    # Minutes utilisables par jour de la semaine (0 = lundi)
+    max_daily_minutes = config.daily_capacity
     
     print(f"🔍 Détection des conflits avec les seuils: nb_max={params.nb_max_par_j}, duree_max={params.default_daily_minutes}, max_revisions_per_day={max_revisions_per_day}")
     
-    planning = json_manager.get_planning()
-    print(f"📋 Éléments de planning à analyser: {len(planning)}")
+    # Charge par date tenue à jour par le gestionnaire de données
+    daily_load = json_manager.get_daily_load()
     
     conflicts = []
-    
-    # Grouper par date
-    daily_stats = {}
-    for item in planning:
-        if item.get('statut') != 'Fait':
-            date_key = item['date_finale']
-            if date_key not in daily_stats:
-                daily_stats[date_key] = {'count': 0, 'duration': 0}
-            daily_stats[date_key]['count'] += 1
-            daily_stats[date_key]['duration'] += item.get('duree', 0)
-    
-    print(f"📊 Statistiques quotidiennes calculées pour {len(daily_stats)} dates")
-    
-    # Mapping des jours de la semaine
-    days_of_week = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
-    
-    # Identifier les conflits
-    for date_key, stats in daily_stats.items():
-        # Calculer la disponibilité pour ce jour de la semaine
-        date_obj = datetime.strptime(date_key, '%Y-%m-%d').date()
-        day_of_week = days_of_week[date_obj.weekday()]
-        day_availability = availability_map.get(day_of_week, params.default_daily_minutes)
-        
-        # Utiliser max_revisions_per_day et la disponibilité du jour
-        max_daily_minutes = min(day_availability, params.default_daily_minutes)
-        
-        if stats['count'] > max_revisions_per_day or stats['duration'] > max_daily_minutes:
-            print(f"⚠️ Conflit détecté le {date_key} ({day_of_week}): {stats['count']} révisions ({stats['duration']} min) - Disponibilité: {day_availability} min")
+    for day, stats in daily_load.items():
+        if stats['count'] > max_revisions_per_day or stats['duration'] > max_daily_minutes[weekday(day)]:
             conflicts.append({
-                'date_finale': date_key,
+                'date_finale': ordinal_to_iso(day),
                 'nb_revisions': stats['count'],
                 'total_duree': stats['duration']
             })
     
-    print(f"📈 Total des conflits détectés: {len(conflicts)}")
+    print(f"📈 Total des conflits détectés: {len(conflicts)} sur {len(daily_load)} dates")
     return conflicts
 
 def rebalance_planning(exam_id: int, params: PlanningParams) -> Dict:
@@ -253,12 +604,15 @@ def rebalance_planning(exam_id: int, params: PlanningParams) -> Dict:
     cours_dict = {c['id']: c for c in cours_list}
     print(f"📚 Cours disponibles: {len(cours_dict)}")
     
+    # Occupation des jours, mise à jour à chaque déplacement
+    calendar = OccupancyCalendar.load(params)
+    
     for conflict in conflicts:
         print(f"🔧 Traitement du conflit du {conflict['date_finale']} avec {conflict['nb_revisions']} révisions")
         
         # Récupérer les éléments de planning pour cette date et cet examen
-        planning_items = [p for p in json_manager.get_planning() 
-                         if p.get('date_finale') == conflict['date_finale'] and p.get('examen_id') == exam_id and p.get('statut') != 'Fait']
+        planning_items = [p for p in json_manager.get_planning_by_date(conflict['date_finale'])
+                         if p.get('examen_id') == exam_id]
         print(f"📋 Éléments de planning trouvés: {len(planning_items)}")
         
         # Enrichir avec les informations des cours pour le tri
@@ -284,10 +638,10 @@ def rebalance_planning(exam_id: int, params: PlanningParams) -> Dict:
         # Déplacer les éléments moins prioritaires
         for item in move_items:
             print(f"🔍 Recherche d'un nouveau slot pour l'élément {item['id']}")
-            new_date = find_slot(item, params)
+            new_date = find_slot(item, params, calendar)
             if new_date:
                 print(f"✅ Nouveau slot trouvé: {new_date} (ancien: {item['date_finale']})")
-                item['date_finale'] = new_date
+                calendar.move(item, new_date)
                 json_manager.update_planning_item(item['id'], item)
                 adjustments += 1
             else:
@@ -301,135 +655,98 @@ def rebalance_planning(exam_id: int, params: PlanningParams) -> Dict:
     }
 
 def rebalance_planning_global(params: PlanningParams) -> Dict:
-    """Rééquilibre le planning global en traitant tous les conflits"""
+    """Rééquilibre le planning global en une passe sur les jours surchargés
+    
+    Le planning en attente est chargé une seule fois. Les éléments des jours en
+    conflit passent dans une file de priorité (date, Majeur d'abord, indice
+    décroissant) : chaque élément reste sur son jour s'il y a encore de la
+    place, sinon il est déplacé vers le premier créneau libre du calendrier
+    d'occupation. Tous les déplacements sont écrits en une seule transaction.
+    """
     print(f"🌍 Début du rééquilibrage GLOBAL")
     conflicts = detect_conflicts(params)
-    print(f"📊 Conflits globaux détectés: {len(conflicts)}")
-    adjustments = 0
-    adjustment_details = []  # Pour stocker les détails des ajustements
+    adjustment_details = []
+    if not conflicts:
+        return {'adjustments': 0, 'conflicts_resolved': 0, 'adjustment_details': adjustment_details}
     
-    # Récupérer les cours pour avoir les priorités
-    cours_list = json_manager.get_cours()
-    cours_dict = {c['id']: c for c in cours_list}
-    print(f"📚 Cours disponibles: {len(cours_dict)}")
+    cours_dict = {c['id']: c for c in json_manager.get_cours()}
+    calendar = OccupancyCalendar.load(params)
     
+    # File de priorité des éléments des jours en conflit
+    queue = []
     for conflict in conflicts:
-        print(f"🔧 Traitement du conflit GLOBAL du {conflict['date_finale']} avec {conflict['nb_revisions']} révisions")
-        
-        # Récupérer TOUS les éléments de planning pour cette date (tous examens)
-        planning_items = [p for p in json_manager.get_planning() 
-                         if p.get('date_finale') == conflict['date_finale'] and p.get('statut') != 'Fait']
-        print(f"📋 Éléments de planning trouvés (tous examens): {len(planning_items)}")
-        
-        # Enrichir avec les informations des cours pour le tri
-        enriched_items = []
-        for item in planning_items:
+        day = iso_to_ordinal(conflict['date_finale'])
+        for position, item in enumerate(json_manager.get_planning_by_date(conflict['date_finale'])):
             cours = cours_dict.get(item.get('cours_id', 0), {})
-            enriched_item = {
-                **item,
-                'type': cours.get('type', 'Mineur'),
-                'priorite_indice': cours.get('priorite_indice', 0),
-                'examen_titre': json_manager.get_examen(item.get('examen_id', 0)).get('titre', 'Inconnu') if json_manager.get_examen(item.get('examen_id', 0)) else 'Inconnu'
-            }
-            enriched_items.append(enriched_item)
+            item = {**item, 'type': cours.get('type', 'Mineur'), 'priorite_indice': cours.get('priorite_indice', 0)}
+            queue.append((day, item['type'] != 'Majeur', -int(item['priorite_indice']), position, item))
+    heapq.heapify(queue)
+    print(f"📋 {len(queue)} éléments répartis sur {len(conflicts)} jours en conflit")
+    
+    moves = []
+    current_day = None
+    while queue:
+        day, _, _, _, item = heapq.heappop(queue)
+        if day != current_day:
+            calendar.release_day(day)
+            current_day = day
         
-        # Trier par priorité (majeurs d'abord, puis par indice)
-        enriched_items.sort(key=lambda x: (x['type'] != 'Majeur', int(x.get('priorite_indice', 0))), reverse=True)
-        print(f"📊 Éléments triés par priorité: {[(item['type'], item['priorite_indice'], item['examen_titre']) for item in enriched_items]}")
-        
-        # Garder les plus prioritaires
-        keep_items = enriched_items[:params.nb_max_par_j]
-        move_items = enriched_items[params.nb_max_par_j:]
-        print(f"✅ Éléments à garder: {len(keep_items)}, 🔄 Éléments à déplacer: {len(move_items)}")
+        # Garder l'élément sur son jour tant que la capacité le permet
+        if calendar.fits(day, load_minutes(item.get('duree'))):
+            calendar.add(item)
+            continue
         
-        # Déplacer les éléments moins prioritaires
-        for item in move_items:
-            print(f"🔍 Recherche d'un nouveau slot pour l'élément {item['id']} (examen {item['examen_titre']})")
-            old_date = item['date_finale']
-            new_date = find_slot(item, params)
-            if new_date:
-                print(f"✅ Nouveau slot trouvé: {new_date} (ancien: {old_date})")
-                item['date_finale'] = new_date
-                json_manager.update_planning_item(item['id'], item)
-                adjustments += 1
-                
-                # Ajouter les détails de l'ajustement
-                adjustment_details.append({
-                    'cours_id': item.get('cours_id'),
-                    'cours_nom': cours_dict.get(item.get('cours_id', 0), {}).get('titre', 'Cours inconnu'),
-                    'jalon': item.get('jalon'),
-                    'ancienne_date': old_date,
-                    'nouvelle_date': new_date,
-                    'duree': item.get('duree')
-                })
-            else:
-                print(f"❌ Aucun slot disponible pour l'élément {item['id']}")
+        new_date = find_slot(item, params, calendar)
+        if new_date:
+            item['date_finale'] = new_date
+            moves.append(item)
+            adjustment_details.append({
+                'cours_id': item.get('cours_id'),
+                'cours_nom': cours_dict.get(item.get('cours_id', 0), {}).get('titre', 'Cours inconnu'),
+                'jalon': item.get('jalon'),
+                'ancienne_date': ordinal_to_iso(day),
+                'nouvelle_date': new_date,
+                'duree': item.get('duree')
+            })
+        else:
+            print(f"❌ Aucun slot disponible pour l'élément {item['id']}")
+        calendar.add(item)
     
-    print(f"📊 Résultat final: {adjustments} ajustements effectués, {len(conflicts)} conflits résolus")
+    with json_manager.transaction():
+        for item in moves:
+            json_manager.update_planning_item(item['id'], item)
+    
+    print(f"📊 Résultat final: {len(moves)} ajustements effectués, {len(conflicts)} conflits résolus")
     return {
-        'adjustments': adjustments, 
+        'adjustments': len(moves),
         'conflicts_resolved': len(conflicts),
         'adjustment_details': adjustment_details
     }
 
-def find_slot(item: Dict, params: PlanningParams) -> Optional[str]:
+def find_slot(item: Dict, params: PlanningParams, calendar: Optional[OccupancyCalendar] = None) -> Optional[str]:
     """Trouve un créneau disponible pour un élément de planning"""
     exam = json_manager.get_examen(item.get('examen_id', 0))
     if not exam:
         return None
     
-    exam_date = datetime.strptime(exam['date_exam'], '%Y-%m-%d').date()
-    candidate = datetime.strptime(item.get('date_finale', '2025-01-01'), '%Y-%m-%d').date()
+    if calendar is None:
+        calendar = OccupancyCalendar.load(params)
     
-    # Récupérer les disponibilités hebdomadaires
-    availability_map = get_availability_map()
+    exam_date = iso_to_ordinal(exam['date_exam'])
+    candidate = iso_to_ordinal(item.get('date_finale', '2025-01-01'))
     
-    # Mapping des jours de la semaine
-    days_of_week = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
+    # Respecter le délai minimum après la dernière révision du même cours
+    cours_id = item.get('cours_id')
+    if cours_id and params.min_gap_days > 0:
+        last_revision_date = calendar.last_revision(cours_id, item.get('id'))
+        if last_revision_date:
+            candidate = max(candidate, last_revision_date + params.min_gap_days)
     
+    duree = load_minutes(item.get('duree'))
     while candidate < exam_date:
-        # Vérifier si le jour de la semaine est disponible
-        day_of_week = days_of_week[candidate.weekday()]
-        day_availability = availability_map.get(day_of_week, 0)
-        
-        if day_availability <= 0:
-            # Jour non disponible, passer au suivant
-            candidate += timedelta(days=1)
-            continue
-        
-        # Vérifier la disponibilité pour cette date
-        daily_planning = [p for p in json_manager.get_planning()
-                         if p.get('date_finale') == candidate.strftime('%Y-%m-%d') and p.get('statut') != 'Fait']
-        
-        total_duration = sum(p.get('duree', 0) for p in daily_planning)
-        count = len(daily_planning)
-        
-        # Vérifier le respect du délai minimum entre révisions du même cours
-        cours_id = item.get('cours_id')
-        min_gap_ok = True
-        if cours_id and params.min_gap_days > 0:
-            # Chercher la dernière révision de ce cours
-            cours_planning = [p for p in json_manager.get_planning()
-                             if p.get('cours_id') == cours_id and p.get('statut') != 'Fait' and p.get('id') != item.get('id')]
-            if cours_planning:
-                # Trier par date pour trouver la plus récente
-                cours_planning.sort(key=lambda x: datetime.strptime(x.get('date_finale', '2025-01-01'), '%Y-%m-%d'))
-                last_revision_date = datetime.strptime(cours_planning[-1].get('date_finale', '2025-01-01'), '%Y-%m-%d').date()
-                days_gap = (candidate - last_revision_date).days
-                if days_gap < params.min_gap_days:
-                    min_gap_ok = False
-        
-        # Récupérer max_revisions_per_day depuis les paramètres
-        parametres = json_manager.get_parametres()
-        max_revisions_per_day = parametres.get('max_revisions_per_day', 3)
-        
-        # Utiliser la disponibilité du jour ou la limite par défaut
-        max_daily_minutes = min(day_availability, params.default_daily_minutes)
-        
-        if count < max_revisions_per_day and total_duration + item.get('duree', 0) <= max_daily_minutes and min_gap_ok:
-            return candidate.strftime('%Y-%m-%d')
-        
-        candidate += timedelta(days=1)
+        if calendar.fits(candidate, duree):
+            return ordinal_to_iso(candidate)
+        candidate += 1
     
     return None
 
@@ -459,19 +776,18 @@ def add_extra_revision_after_score(course_id: int, jalon: int, score: int, total
     
     # Utiliser la date d'évaluation si fournie, sinon utiliser la date actuelle
     if date_eval:
-        eval_date = datetime.strptime(date_eval, '%Y-%m-%d').date()
-        jalon_date = eval_date + timedelta(days=2)  # 2 jours après l'évaluation
+        jalon_date = ordinal_to_iso(iso_to_ordinal(date_eval) + 2)  # 2 jours après l'évaluation
     else:
         # Date de la révision supplémentaire : 2 jours après aujourd'hui
-        jalon_date = datetime.now().date() + timedelta(days=2)
+        jalon_date = ordinal_to_iso(today_ordinal() + 2)
     
-    print(f"📅 Révision supplémentaire prévue le {jalon_date.strftime('%Y-%m-%d')}")
+    print(f"📅 Révision supplémentaire prévue le {jalon_date}")
     
     extra_revision = {
         'cours_id': course_id,
         'examen_id': course['examen_id'],
         'jalon': jalon + 1,
-        'date_finale': jalon_date.strftime('%Y-%m-%d'),
+        'date_finale': jalon_date,
         'duree': 30,  # Durée courte pour révision supplémentaire
         'statut': 'À faire',
         'type': course['type'],
@@ -482,30 +798,22 @@ def add_extra_revision_after_score(course_id: int, jalon: int, score: int, total
 
 def adjust_planning_after_high_score(course_id: int, jalon: int, params: PlanningParams, date_eval: str = None):
     """Espace les révisions suivantes après un bon score"""
-    planning_items = [p for p in json_manager.get_planning() 
-                     if p.get('cours_id') == course_id and p.get('jalon', 0) > jalon and p.get('statut') == 'À faire']
+    planning_items = json_manager.get_planning_by_course(course_id, jalon_min=jalon, statut='À faire')
     
     print(f"📊 Espacement de {len(planning_items)} révisions après bon score")
     if date_eval:
         print(f"📅 Date d'évaluation: {date_eval}")
     
     for item in planning_items:
-        current_date = datetime.strptime(item['date_finale'], '%Y-%m-%d').date()
-        new_date = current_date + timedelta(days=params.bonus_ok_days)
-        item['date_finale'] = new_date.strftime('%Y-%m-%d')
+        current_date = item['date_finale']
+        item['date_finale'] = ordinal_to_iso(iso_to_ordinal(current_date) + params.bonus_ok_days)
         json_manager.update_planning_item(item['id'], item)
-        print(f"📅 Révision {item['jalon']} décalée du {current_date.strftime('%Y-%m-%d')} au {new_date.strftime('%Y-%m-%d')}")
+        print(f"📅 Révision {item['jalon']} décalée du {current_date} au {item['date_finale']}")
 
 def mark_planning_item_as_done(course_id: int, jalon: int):
     """Marque un élément de planning comme 'Fait' quand un score est ajouté"""
-    planning_items = json_manager.get_planning()
-    
     # Trouver l'élément de planning correspondant
-    planning_item = None
-    for item in planning_items:
-        if item.get('cours_id') == course_id and item.get('jalon') == jalon:
-            planning_item = item
-            break
+    planning_item = json_manager.find_planning_item(course_id, jalon)
     
     if planning_item and planning_item.get('statut') != 'Fait':
         # Marquer comme "Fait" avec la date d'aujourd'hui
@@ -519,6 +827,166 @@ def mark_planning_item_as_done(course_id: int, jalon: int):
     else:
         print(f"⚠️ Aucun élément de planning trouvé pour cours {course_id}, jalon {jalon}")
 
+# === ARCHIVAGE DES EXAMENS PASSÉS ===
+
+def archive_past_exams(date_limite: Optional[str] = None) -> Dict:
+    """Déplace les examens antérieurs à `date_limite` (et leurs cours, planning et scores) dans l'archive
+    
+    Par défaut, la date limite est aujourd'hui moins `archive_after_days` jours
+    (paramètre, 30 par défaut). Les examens sont ajoutés à l'archive avant
+    d'être supprimés des données actives, dans une même transaction : un arrêt
+    entre les deux laisse au pire un doublon dans l'archive, jamais de perte.
+    """
+    if date_limite:
+        cutoff = iso_to_ordinal(date_limite)
+    else:
+        cutoff = today_ordinal() - int(json_manager.get_parametres().get('archive_after_days', DEFAULT_ARCHIVE_AFTER_DAYS))
+    report = {'date_limite': ordinal_to_iso(cutoff), 'examens': 0, 'cours': 0, 'planning': 0, 'scores': 0}
+    
+    with json_manager.transaction():
+        exams = [exam for exam in json_manager.get_examens()
+                 if exam.get('date_exam') and iso_to_ordinal(exam['date_exam']) < cutoff]
+        bundles = []
+        for exam in exams:
+            cours = json_manager.get_cours(exam['id'])
+            bundle = {
+                'examen': exam,
+                'cours': cours,
+                'planning': json_manager.get_planning(exam['id']),
+                'scores': [score for course in cours for score in json_manager.get_scores(course['id'])],
+                'archive_le': ordinal_to_iso(today_ordinal())
+            }
+            for key in ('cours', 'planning', 'scores'):
+                report[key] += len(bundle[key])
+            bundles.append(bundle)
+        if bundles:
+            cold_archive.append(bundles)
+            for exam in exams:
+                json_manager.delete_examen(exam['id'])
+        report['examens'] = len(bundles)
+    
+    print(f"🧊 {report['examens']} examens antérieurs au {report['date_limite']} archivés "
+          f"({report['planning']} révisions, {report['scores']} scores)")
+    return report
+
+def archive_if_due():
+    """Lance l'archivage automatique quand REVISIONCAM_ARCHIVE_INTERVAL_HOURS est écoulé"""
+    global _last_archive_run
+    if ARCHIVE_INTERVAL_HOURS <= 0:
+        return
+    now = time.monotonic()
+    if _last_archive_run is not None and now - _last_archive_run < ARCHIVE_INTERVAL_HOURS * 3600:
+        return
+    _last_archive_run = now
+    try:
+        archive_past_exams()
+    except Exception as e:
+        print(f"❌ Erreur lors de l'archivage automatique: {e}")
+
+def include_archive() -> bool:
+    """La requête demande explicitement les données archivées (`?archive=1`)"""
+    return request.args.get('archive', '0') in ('1', 'true')
+
+# === LISTES : PAGINATION, FILTRES ET PROJECTION ===
+
+def parse_list_args() -> Optional[Dict[str, Any]]:
+    """Paramètres des listes : limit, cursor, from, to (dates ISO incluses), statut, fields (None si invalides)"""
+    args = request.args
+    query = {'limit': None, 'after_id': None, 'date_from': None, 'date_to': None,
+             'statut': args.get('statut') or None, 'fields': None}
+    try:
+        if 'limit' in args:
+            query['limit'] = int(args['limit'])
+            if query['limit'] < 1:
+                return None
+        if 'cursor' in args:
+            query['after_id'] = int(args['cursor'])
+        for arg, key in (('from', 'date_from'), ('to', 'date_to')):
+            if args.get(arg):
+                query[key] = ordinal_to_iso(iso_to_ordinal(args[arg]))
+    except ValueError:
+        return None
+    if args.get('fields'):
+        query['fields'] = [field.strip() for field in args['fields'].split(',') if field.strip()]
+    return query
+
+def invalid_list_args():
+    """Réponse 400 pour des paramètres de liste invalides"""
+    return jsonify({"error": "Paramètres invalides : limit > 0, cursor entier, from/to au format AAAA-MM-JJ"}), 400
+
+def page_rows(rows: List[Dict], query: Dict[str, Any], date_field: Optional[str] = None,
+              filter_statut: bool = False) -> List[Dict]:
+    """Filtre une liste déjà lue et la borne à `limit` + 1 éléments (mêmes règles que get_planning_page)"""
+    if date_field and (query['date_from'] or query['date_to']):
+        day_from = iso_to_ordinal(query['date_from']) if query['date_from'] else None
+        day_to = iso_to_ordinal(query['date_to']) if query['date_to'] else None
+        rows = [row for row in rows if date_in_range(row.get(date_field), day_from, day_to)]
+    if filter_statut and query['statut'] is not None:
+        rows = [row for row in rows if row.get('statut') == query['statut']]
+    if query['after_id'] is not None or query['limit'] is not None:
+        rows = [row for row in rows if isinstance(row.get('id'), int)
+                and (query['after_id'] is None or row['id'] > query['after_id'])]
+        if query['limit'] is not None:
+            rows = heapq.nsmallest(query['limit'] + 1, rows, key=lambda row: row['id'])
+        else:
+            rows.sort(key=lambda row: row['id'])
+    return rows
+
+def split_page(rows: List[Dict], query: Dict[str, Any]) -> Tuple[List[Dict], Optional[int]]:
+    """Sépare la page (au plus `limit` éléments) du curseur de la suivante (dernier id rendu)"""
+    if query['limit'] is None or len(rows) <= query['limit']:
+        return rows, None
+    rows = rows[:query['limit']]
+    return rows, rows[-1]['id']
+
+def list_response(rows: List[Dict], query: Dict[str, Any], next_cursor: Optional[int] = None):
+    """Liste JSON projetée sur `fields`, avec le curseur de la page suivante dans X-Next-Cursor"""
+    if query['fields']:
+        rows = [{field: row[field] for field in query['fields'] if field in row} for row in rows]
+    response = jsonify(rows)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+# === REQUÊTES CONDITIONNELLES (ETAG) ===
+
+def conditional(*tables: str, cached: bool = False):
+    """Répond 304 sans lire les données si l'ETag demandé (If-None-Match) est toujours valable
+    
+    L'ETag est dérivé de l'URL et des versions des tables (ou de `config`) dont
+    dépend la réponse. Les versions sont lues avant les données : une réponse
+    n'est jamais étiquetée plus récente que son contenu.
+    
+    Avec `cached=True` (vues dérivées coûteuses), le corps encodé est gardé
+    dans `response_cache` et resservi tant que l'ETag est le même.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = {table: json_manager.get_data_version(table) for table in tables}
+            parts = [ETAG_SALT, request.full_path] + list(versions.values())
+            if include_archive():
+                parts.append(cold_archive.get_version())
+            etag = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+            if etag in request.if_none_match:
+                response = app.response_class(status=304)
+            else:
+                body = response_cache.get(request.full_path, etag) if cached else None
+                if body is not None:
+                    response = app.response_class(body, mimetype='application/json')
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if cached:
+                        response_cache.put(request.full_path, etag, versions, response.get_data())
+            response.set_etag(etag)
+            # Le navigateur garde la réponse mais la revalide à chaque utilisation
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
 # === ENDPOINTS API ===
 
 @app.route('/api/health', methods=['GET'])
@@ -528,19 +996,27 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "data_stats": stats,
+        "response_cache": response_cache.get_stats(),
         "timestamp": datetime.now().isoformat()
     })
 
 @app.route('/api/examens', methods=['GET'])
+@conditional('examens')
 def get_examens():
-    """Récupérer tous les examens"""
+    """Récupérer tous les examens (et les examens archivés avec ?archive=1)"""
     examens = json_manager.get_examens()
+    if include_archive():
+        examens = examens + cold_archive.get_examens()
     return jsonify(examens)
 
 @app.route('/api/examens/<int:exam_id>', methods=['GET'])
+@conditional('examens')
 def get_examen(exam_id):
     """Récupérer un examen spécifique"""
     examen = json_manager.get_examen(exam_id)
+    if not examen and include_archive():
+        bundle = cold_archive.get_bundle(exam_id)
+        examen = bundle and {**bundle['examen'], 'archive_le': bundle.get('archive_le')}
     if not examen:
         return jsonify({"error": "Examen non trouvé"}), 404
     return jsonify(examen)
@@ -578,24 +1054,37 @@ def delete_examen(exam_id):
     return jsonify({"message": "Examen supprimé"})
 
 @app.route('/api/cours', methods=['GET'])
+@conditional('cours', 'examens', cached=True)
 def get_cours():
-    """Récupérer tous les cours ou ceux d'un examen spécifique"""
+    """Récupérer tous les cours ou ceux d'un examen spécifique
+    
+    Accepte limit/cursor et fields.
+    """
+    query = parse_list_args()
+    if query is None:
+        return invalid_list_args()
     examen_id = request.args.get('examen_id', type=int)
     cours = json_manager.get_cours(examen_id)
-    
-    # Enrichir les cours avec les informations des examens
     examens = json_manager.get_examens()
+    if include_archive():
+        cours = cours + cold_archive.get_cours(examen_id)
+        examens = examens + cold_archive.get_examens()
+    cours, next_cursor = split_page(page_rows(cours, query), query)
+    
+    # Enrichir des copies des cours (les enregistrements stockés ne sont jamais modifiés en place)
     examens_dict = {e['id']: e for e in examens}
     
+    enriched = []
     for course in cours:
         exam = examens_dict.get(course.get('examen_id'))
         if exam:
-            course['examen_nom'] = exam.get('titre', 'Examen inconnu')
-            course['date_exam'] = exam.get('date_exam')
+            course = {**course, 'examen_nom': exam.get('titre', 'Examen inconnu'), 'date_exam': exam.get('date_exam')}
+        enriched.append(course)
     
-    return jsonify(cours)
+    return list_response(enriched, query, next_cursor)
 
 @app.route('/api/cours/<int:cours_id>', methods=['GET'])
+@conditional('cours')
 def get_cours_by_id(cours_id):
     """Récupérer un cours spécifique"""
     cours = json_manager.get_cours_by_id(cours_id)
@@ -610,10 +1099,11 @@ def create_cours():
     if not data or 'titre' not in data or 'examen_id' not in data:
         return jsonify({"error": "Données manquantes"}), 400
     
-    cours = json_manager.create_cours(data)
-    
-    # Générer automatiquement le planning pour ce cours
-    regenerate_planning_for_exam(cours['examen_id'])
+    with json_manager.transaction():
+        cours = json_manager.create_cours(data)
+        
+        # Générer automatiquement le planning pour ce cours
+        replan_course(cours['id'])
     
     return jsonify(cours), 201
 
@@ -624,14 +1114,13 @@ def update_cours(cours_id):
     if not data:
         return jsonify({"error": "Données manquantes"}), 400
     
-    success = json_manager.update_cours(cours_id, data)
-    if not success:
-        return jsonify({"error": "Cours non trouvé"}), 404
-    
-    # Régénérer le planning
-    cours = json_manager.get_cours_by_id(cours_id)
-    if cours:
-        regenerate_planning_for_exam(cours['examen_id'])
+    with json_manager.transaction():
+        success = json_manager.update_cours(cours_id, data)
+        if not success:
+            return jsonify({"error": "Cours non trouvé"}), 404
+        
+        # Replanifier uniquement ce cours
+        replan_course(cours_id)
     
     return jsonify({"message": "Cours mis à jour"})
 
@@ -642,24 +1131,32 @@ def delete_cours(cours_id):
     if not cours:
         return jsonify({"error": "Cours non trouvé"}), 404
     
-    exam_id = cours['examen_id']
-    success = json_manager.delete_cours(cours_id)
-    
-    # Régénérer le planning
-    regenerate_planning_for_exam(exam_id)
+    # Le planning du cours est supprimé avec lui, les autres cours ne changent pas
+    json_manager.delete_cours(cours_id)
     
     return jsonify({"message": "Cours supprimé"})
 
 @app.route('/api/planning/consolidated', methods=['GET'])
+@conditional('planning', 'cours', 'examens', cached=True)
 def get_planning_consolidated():
-    """Récupérer le planning consolidé avec informations des cours et examens"""
-    planning = json_manager.get_planning()
-    cours_list = json_manager.get_cours()
-    examens_list = json_manager.get_examens()
-    
-    # Créer des dictionnaires pour un accès rapide
-    cours_dict = {c['id']: c for c in cours_list}
-    examens_dict = {e['id']: e for e in examens_list}
+    """Récupérer le planning consolidé avec informations des cours et examens
+    
+    Accepte limit/cursor, from/to (date_finale), statut et fields : seule la
+    page demandée est lue puis enrichie.
+    """
+    query = parse_list_args()
+    if query is None:
+        return invalid_list_args()
+    planning = json_manager.get_planning_page(
+        date_from=query['date_from'], date_to=query['date_to'], statut=query['statut'],
+        after_id=query['after_id'], limit=query['limit'] + 1 if query['limit'] else None)
+    planning, next_cursor = split_page(planning, query)
+    
+    # Seuls les cours et examens de la page sont lus
+    cours_dict = {cours_id: json_manager.get_cours_by_id(cours_id) or {}
+                  for cours_id in {item.get('cours_id') for item in planning if item.get('cours_id')}}
+    examens_dict = {examen_id: json_manager.get_examen(examen_id) or {}
+                    for examen_id in {item.get('examen_id') for item in planning if item.get('examen_id')}}
     
     # Enrichir le planning avec les informations des cours et examens
     consolidated = []
@@ -677,19 +1174,31 @@ def get_planning_consolidated():
             }
             consolidated.append(consolidated_item)
     
-    return jsonify(consolidated)
+    return list_response(consolidated, query, next_cursor)
 
 @app.route('/api/planning/exam/<int:exam_id>', methods=['GET'])
+@conditional('planning', 'examens')
 def get_planning_for_exam(exam_id):
-    """Récupérer le planning pour un examen spécifique"""
-    planning = json_manager.get_planning(exam_id)
-    return jsonify(planning)
+    """Récupérer le planning pour un examen spécifique (archivé avec ?archive=1)
+    
+    Accepte limit/cursor, from/to (date_finale), statut et fields.
+    """
+    query = parse_list_args()
+    if query is None:
+        return invalid_list_args()
+    planning = json_manager.get_planning_page(
+        exam_id, query['date_from'], query['date_to'], query['statut'],
+        query['after_id'], query['limit'] + 1 if query['limit'] else None)
+    if not planning and include_archive() and not json_manager.get_examen(exam_id):
+        planning = page_rows(cold_archive.get_planning(exam_id), query, 'date_finale', filter_statut=True)
+    planning, next_cursor = split_page(planning, query)
+    return list_response(planning, query, next_cursor)
 
 @app.route('/api/planning/course/<int:course_id>', methods=['GET'])
+@conditional('planning')
 def get_planning_for_course(course_id):
     """Récupérer le planning pour un cours spécifique"""
-    planning = json_manager.get_planning()
-    course_planning = [item for item in planning if item.get('cours_id') == course_id]
+    course_planning = json_manager.get_planning_by_course(course_id)
     return jsonify(course_planning)
 
 @app.route('/api/planning/<int:planning_id>', methods=['PUT'])
@@ -720,7 +1229,8 @@ def rebalance_planning_endpoint(exam_id):
     params = load_params()
     print(f"⚙️ Paramètres chargés: nb_max_par_j={params.nb_max_par_j}, duree_max={params.duree_max}")
     
-    result = rebalance_planning(exam_id, params)
+    with json_manager.transaction():
+        result = rebalance_planning(exam_id, params)
     print(f"📊 Résultat du rééquilibrage: {result}")
     
     return jsonify(result)
@@ -733,12 +1243,19 @@ def rebalance_planning_global_endpoint():
     params = load_params()
     print(f"⚙️ Paramètres chargés: nb_max_par_j={params.nb_max_par_j}, duree_max={params.default_daily_minutes}")
     
-    result = rebalance_planning_global(params)
+    with json_manager.transaction():
+        result = rebalance_planning_global(params)
     print(f"📊 Résultat du rééquilibrage global: {result}")
     
     return jsonify(result)
 
+@app.route('/api/planning/replan-all', methods=['POST'])
+def replan_all_endpoint():
+    """Régénérer le planning de tous les examens"""
+    return jsonify(replan_all_exams())
+
 @app.route('/api/planning/conflicts', methods=['GET'])
+@conditional('planning', 'examens', 'config', cached=True)
 def get_planning_conflicts():
     """Récupérer les conflits de planning avec informations détaillées"""
     params = load_params()
@@ -751,13 +1268,10 @@ def get_planning_conflicts():
     enriched_conflicts = []
     for conflict in conflicts:
         # Récupérer les examens concernés par ce conflit
-        planning = json_manager.get_planning()
         examens_concernes = set()
         
-        for item in planning:
-            if (item.get('date_finale') == conflict['date_finale'] and 
-                item.get('statut') != 'Fait' and 
-                item.get('examen_id')):
+        for item in json_manager.get_planning_by_date(conflict['date_finale']):
+            if item.get('examen_id'):
                 examens_concernes.add(item['examen_id'])
         
         # Ajouter les noms des examens
@@ -774,11 +1288,80 @@ def get_planning_conflicts():
     return jsonify(enriched_conflicts)
 
 @app.route('/api/scores', methods=['GET'])
+@conditional('scores')
 def get_scores():
-    """Récupérer tous les scores ou ceux d'un cours spécifique"""
+    """Récupérer tous les scores ou ceux d'un cours spécifique
+    
+    Accepte limit/cursor, from/to (date_eval) et fields.
+    """
+    query = parse_list_args()
+    if query is None:
+        return invalid_list_args()
     cours_id = request.args.get('cours_id', type=int)
     scores = json_manager.get_scores(cours_id)
-    return jsonify(scores)
+    if include_archive():
+        scores = scores + cold_archive.get_scores(cours_id)
+    scores, next_cursor = split_page(page_rows(scores, query, 'date_eval'), query)
+    return list_response(scores, query, next_cursor)
+
+@app.route('/api/dashboard', methods=['GET'])
+@conditional('examens', 'cours', 'scores', 'planning', cached=True)
+def get_dashboard():
+    """Examens avec leurs cours, et avec ?include=scores,planning leurs scores et leur planning
+    
+    Remplace la suite de requêtes examens → cours par examen → scores et
+    planning par cours : chaque table est lue une fois (par index quand
+    `examen_id` ou `cours_id` filtre) puis regroupée par cours.
+    """
+    examen_id = request.args.get('examen_id', type=int)
+    cours_id = request.args.get('cours_id', type=int)
+    include = {part.strip() for part in request.args.get('include', '').split(',') if part.strip()}
+    if include - {'scores', 'planning'}:
+        return jsonify({"error": "include accepte uniquement 'scores' et 'planning'"}), 400
+    
+    if cours_id is not None:
+        course = json_manager.get_cours_by_id(cours_id)
+        courses = [course] if course and examen_id in (None, course.get('examen_id')) else []
+        examens = [exam for exam in map(json_manager.get_examen, {c.get('examen_id') for c in courses}) if exam]
+    elif examen_id is not None:
+        courses = json_manager.get_cours(examen_id)
+        examens = [exam for exam in [json_manager.get_examen(examen_id)] if exam]
+    else:
+        courses = json_manager.get_cours()
+        examens = json_manager.get_examens()
+    
+    scores_by_course: Dict[int, List[Dict]] = {}
+    if 'scores' in include:
+        if cours_id is not None or examen_id is not None:
+            scores = [score for course in courses for score in json_manager.get_scores(course['id'])]
+        else:
+            scores = json_manager.get_scores()
+        for score in scores:
+            scores_by_course.setdefault(score.get('cours_id'), []).append(score)
+    
+    planning_by_course: Dict[int, List[Dict]] = {}
+    if 'planning' in include:
+        if cours_id is not None:
+            planning = json_manager.get_planning_by_course(cours_id) if courses else []
+        else:
+            planning = json_manager.get_planning(examen_id)
+        for item in planning:
+            planning_by_course.setdefault(item.get('cours_id'), []).append(item)
+    
+    examens_dict = {exam['id']: exam for exam in examens}
+    cours_by_exam: Dict[int, List[Dict]] = {}
+    for course in courses:
+        exam = examens_dict.get(course.get('examen_id'))
+        if exam is None:
+            continue
+        entry = {**course, 'examen_nom': exam.get('titre', 'Examen inconnu'), 'date_exam': exam.get('date_exam')}
+        if 'scores' in include:
+            entry['scores'] = scores_by_course.get(course['id'], [])
+        if 'planning' in include:
+            entry['planning'] = planning_by_course.get(course['id'], [])
+        cours_by_exam.setdefault(exam['id'], []).append(entry)
+    
+    return jsonify([{**exam, 'cours': cours_by_exam.get(exam['id'], [])} for exam in examens])
 
 @app.route('/api/scores', methods=['POST'])
 def create_score():
@@ -810,19 +1393,21 @@ def create_score():
     data['score'] = score
     data['total'] = total
     
-    score_result = json_manager.create_score(data)
-    
-    # Marquer automatiquement la révision comme "Fait" dans le planning
-    if isinstance(jalon, int):
-        mark_planning_item_as_done(cours_id, jalon)
+    with json_manager.transaction():
+        score_result = json_manager.create_score(data)
         
-        # Ajuster le planning selon le score
-        date_eval = data.get('date_eval')
-        adjust_planning_with_score(cours_id, jalon, score, total, date_eval)
+        # Marquer automatiquement la révision comme "Fait" dans le planning
+        if isinstance(jalon, int):
+            mark_planning_item_as_done(cours_id, jalon)
+            
+            # Ajuster le planning selon le score
+            date_eval = data.get('date_eval')
+            adjust_planning_with_score(cours_id, jalon, score, total, date_eval)
     
     return jsonify({"message": "Score créé avec succès", "score": score_result}), 201
 
 @app.route('/api/parametres', methods=['GET'])
+@conditional('config')
 def get_parametres():
     """Récupérer tous les paramètres"""
     parametres = json_manager.get_parametres()
@@ -833,6 +1418,7 @@ def get_parametres():
     return jsonify([{"cle": k, "valeur": v} for k, v in parametres.items()])
 
 @app.route('/api/parametres/<key>', methods=['GET'])
+@conditional('config')
 def get_parametre(key):
     """Récupérer un paramètre spécifique"""
     valeur = json_manager.get_parametre(key)
@@ -849,7 +1435,9 @@ def update_parametre(key):
     
     # Validation de la valeur selon le type de paramètre
     valeur = data['valeur']
-    numeric_params = ['duree_min', 'duree_max', 'nb_max_par_j', 'nb_min_par_j', 'bonus_ok', 'bonus_fail', 'seuil_ok', 'seuil_fail', 'temps_pause']
+    numeric_params = ['duree_min', 'duree_max', 'nb_max_par_j', 'nb_min_par_j', 'bonus_ok', 'bonus_fail', 'seuil_ok', 'seuil_fail', 'temps_pause',
+                      'revision_finale_jours', 'min_gap_days', 'bonus_ok_days', 'max_revisions_per_day', 'placement_tolerance_days',
+                      'archive_after_days']
     
     if key in numeric_params:
         try:
@@ -859,13 +1447,25 @@ def update_parametre(key):
         except (ValueError, TypeError):
             return jsonify({"error": f"Valeur numérique requise pour {key}"}), 400
     
-    success = json_manager.update_parametre(key, valeur)
-    if not success:
-        return jsonify({"error": f"Paramètre '{key}' non trouvé"}), 404
+    with json_manager.transaction():
+        previous = json_manager.get_parametre(key)
+        success = json_manager.update_parametre(key, valeur)
+        if not success:
+            return jsonify({"error": f"Paramètre '{key}' non trouvé"}), 404
+        
+        # Replanifier tous les examens si la génération en dépend
+        replan = None
+        planning_keys = REPLAN_PARAMS + (CAPACITY_PARAMS if load_params().placement_tolerance_days > 0 else ())
+        if key in planning_keys and previous != valeur:
+            replan = replan_all_exams()
     
-    return jsonify({"message": "Paramètre mis à jour"})
+    response = {"message": "Paramètre mis à jour"}
+    if replan:
+        response["replanification"] = replan
+    return jsonify(response)
 
 @app.route('/api/bareme', methods=['GET'])
+@conditional('config')
 def get_bareme():
     """Récupérer le barème"""
     bareme = json_manager.get_bareme()
@@ -883,11 +1483,18 @@ def update_bareme():
         if 'indice' not in item or 'nb_revisions' not in item:
             return jsonify({"error": "Structure de barème invalide"}), 400
     
-    json_manager.data['bareme'] = data
-    json_manager._save_data()
-    return jsonify({"message": "Barème mis à jour"})
+    with json_manager.transaction():
+        changed = json_manager.get_bareme() != data
+        json_manager.update_bareme(data)
+        replan = replan_all_exams() if changed else None
+    
+    response = {"message": "Barème mis à jour"}
+    if replan:
+        response["replanification"] = replan
+    return jsonify(response)
 
 @app.route('/api/disponibilites', methods=['GET'])
+@conditional('config')
 def get_disponibilites():
     """Récupérer les disponibilités"""
     disponibilites = json_manager.get_disponibilites()
@@ -933,24 +1540,24 @@ def update_disponibilite_weekly(day):
     if not data:
         return jsonify({"error": "Données manquantes"}), 400
     
-    # Mettre à jour ou créer la disponibilité hebdomadaire
-    disponibilites = json_manager.get_disponibilites()
+    # Mettre à jour ou créer la disponibilité hebdomadaire (sur une nouvelle liste)
+    disponibilites = list(json_manager.get_disponibilites())
     
     # Chercher si une disponibilité existe déjà pour ce jour
     updated = False
     for i, disp in enumerate(disponibilites):
         if disp.get('type') == 'weekly' and disp.get('jour') == day:
-            disponibilites[i].update({
+            disponibilites[i] = {
+                **disp,
                 'disponible': data.get('disponible', True),
                 'heures': data.get('heures', {'debut': '09:00', 'fin': '18:00'})
-            })
+            }
             updated = True
             break
     
     # Si pas trouvé, créer une nouvelle entrée
     if not updated:
         new_disp = {
-            'id': json_manager.get_next_id('disponibilites'),
             'type': 'weekly',
             'jour': day,
             'disponible': data.get('disponible', True),
@@ -958,21 +1565,102 @@ def update_disponibilite_weekly(day):
         }
         disponibilites.append(new_disp)
     
-    json_manager.save_data('disponibilites', disponibilites)
+    json_manager.update_disponibilites(disponibilites)
     return jsonify({"message": f"Disponibilité du {day} mise à jour"})
 
 # === NOUVEAUX ENDPOINTS D'IMPORT/EXPORT ===
 
+@app.route('/api/archive', methods=['POST'])
+def archive_endpoint():
+    """Archiver les examens passés (date limite optionnelle : {"date_limite": "AAAA-MM-JJ"})"""
+    data = request.get_json(silent=True) or {}
+    date_limite = data.get('date_limite')
+    if date_limite:
+        try:
+            iso_to_ordinal(date_limite)
+        except (ValueError, TypeError):
+            return jsonify({"error": "date_limite doit être au format AAAA-MM-JJ"}), 400
+    return jsonify(archive_past_exams(date_limite))
+
+@app.route('/api/archive', methods=['GET'])
+def get_archive_stats():
+    """Volume de l'archive des examens passés"""
+    return jsonify(cold_archive.get_stats())
+
+@app.route('/api/archive/examens', methods=['GET'])
+def get_archived_examens():
+    """Lister les examens archivés"""
+    return jsonify(cold_archive.get_examens())
+
+@app.route('/api/archive/examens/<int:exam_id>', methods=['GET'])
+def get_archived_examen(exam_id):
+    """Récupérer un examen archivé avec ses cours, son planning et ses scores"""
+    bundle = cold_archive.get_bundle(exam_id)
+    if not bundle:
+        return jsonify({"error": "Examen archivé non trouvé"}), 404
+    return jsonify(bundle)
+
+# Sections exportables séparément (les sections inconnues ne sont exportées qu'avec tout le reste)
+EXPORT_SECTIONS = RECORD_TABLES + ("parametres", "bareme", "disponibilites", "sequences")
+# Enregistrements lus et encodés ensemble pendant un export
+EXPORT_BATCH_SIZE = 1000
+
+def indented_json(value: Any, depth: int) -> str:
+    """Valeur encodée comme json.dumps(indent=2) l'écrirait à la profondeur `depth`"""
+    return json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n' + '  ' * depth)
+
+def export_json_chunks(sections):
+    """Document JSON de l'export, identique à json.dumps(indent=2), produit par morceaux"""
+    first = True
+    for section, value in sections:
+        yield ('{' if first else ',') + f'\n  {json.dumps(section, ensure_ascii=False)}: '
+        first = False
+        if section not in RECORD_TABLES:
+            yield indented_json(value, 1)
+            continue
+        opening = '['
+        for batch in iter(lambda: list(islice(value, EXPORT_BATCH_SIZE)), []):
+            # Les lots sont encodés d'un bloc, sans leurs crochets
+            yield opening + indented_json(batch, 1)[1:-4]
+            opening = ','
+        yield '[]' if opening == '[' else '\n  ]'
+    yield '{}' if first else '\n}'
+
+def export_ndjson_lines(sections):
+    """Export NDJSON : une ligne {"table", "data"} par enregistrement (par élément pour les autres listes)"""
+    for section, value in sections:
+        records = iter(value if section in RECORD_TABLES or isinstance(value, list) else [value])
+        for batch in iter(lambda: list(islice(records, EXPORT_BATCH_SIZE)), []):
+            yield ''.join(json.dumps({"table": section, "data": record}, ensure_ascii=False) + '\n'
+                          for record in batch)
+
 @app.route('/api/export', methods=['GET'])
 def export_data():
-    """Exporter toutes les données au format JSON"""
+    """Exporter les données au format JSON, en flux
+    
+    `?format=ndjson` produit une ligne par enregistrement (`{"table", "data"}`) ;
+    `tables=cours,planning` et `examen_id` restreignent l'export.
+    """
+    export_format = request.args.get('format', 'json')
+    tables = None
+    if request.args.get('tables'):
+        tables = [table.strip() for table in request.args['tables'].split(',') if table.strip()]
+    if export_format not in ('json', 'ndjson') or (tables is not None and not set(tables) <= set(EXPORT_SECTIONS)):
+        return jsonify({"error": f"Paramètres invalides : format json ou ndjson, tables parmi {', '.join(EXPORT_SECTIONS)}"}), 400
+    examen_id = request.args.get('examen_id', type=int)
+    if examen_id is not None and not json_manager.get_examen(examen_id):
+        return jsonify({"error": "Examen non trouvé"}), 404
     try:
-        data = json_manager.export_data()
-        return send_file(
-            json_manager.json_file,
-            as_attachment=True,
-            download_name=f"revisioncam_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mimetype='application/json'
+        sections = json_manager.iter_export(tables, examen_id, EXPORT_BATCH_SIZE)
+        filename = f"revisioncam_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+        if export_format == 'ndjson':
+            body, mimetype = export_ndjson_lines(sections), 'application/x-ndjson'
+        else:
+            body, mimetype = export_json_chunks(sections), 'application/json'
+        return app.response_class(
+            body,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
     except Exception as e:
         return jsonify({"error": f"Erreur lors de l'export: {str(e)}"}), 500
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Archive froide de RevisionCam
+Les examens passés (avec leurs cours, planning et scores) quittent les données
+actives pour un fichier JSON Lines compressé, auquel on ne fait qu'ajouter
+"""
+
+import json
+import os
+import threading
+import zlib
+from typing import Dict, List, Any, Optional
+
+# Taille maximale des morceaux décompressés lors d'un parcours de l'archive
+WALK_CHUNK_SIZE = 1024 * 1024
+
+class ColdArchive:
+    """Archive des examens passés : un lot d'examens par membre gzip
+
+    Chaque archivage ajoute un membre gzip contenant une ligne JSON par examen
+    (`{"examen", "cours", "planning", "scores", "archive_le"}`) ; le fichier
+    reste lisible par `zcat`. Un membre tronqué par un arrêt brutal est ignoré
+    à la lecture puis écarté avant l'ajout suivant. Si un examen apparaît
+    plusieurs fois (archivage interrompu avant la suppression des données
+    actives), la dernière version l'emporte.
+
+    Seules les lectures (`bundles`, `get_bundle`...) décodent l'archive et la
+    gardent en cache tant que le fichier ne change pas ; un ajout se contente
+    de repérer la fin des membres complets, sans décoder ni retenir le JSON.
+    """
+
+    def __init__(self, archive_file: str = "revisioncam_archive.jsonl.gz"):
+        self.archive_file = archive_file
+        self.lock = threading.RLock()
+        self._stamp = None
+        self._bundles: Dict[int, Dict] = {}
+        # Fin des membres complets, et empreinte du fichier à laquelle elle a été mesurée
+        self._scan_stamp = None
+        self._valid_size = 0
+
+    def _disk_stamp(self) -> Optional[tuple]:
+        """Empreinte du fichier d'archive (inode, taille, mtime)"""
+        try:
+            st = os.stat(self.archive_file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _walk(self, on_payload=None) -> int:
+        """Parcourt les membres gzip complets et renvoie la taille de la partie valide
+        
+        Sans `on_payload`, le contenu décompressé est jeté au fil de l'eau ; sinon
+        chaque membre décompressé lui est passé.
+        """
+        with open(self.archive_file, 'rb') as f:
+            raw = f.read()
+        valid_size = 0
+        while valid_size < len(raw):
+            decompressor = zlib.decompressobj(wbits=31)
+            data = raw[valid_size:]
+            chunks = []
+            try:
+                while not decompressor.eof:
+                    chunk = decompressor.decompress(data, WALK_CHUNK_SIZE)
+                    data = decompressor.unconsumed_tail
+                    if on_payload is not None:
+                        chunks.append(chunk)
+                    if not chunk and not data:
+                        break
+            except zlib.error:
+                pass
+            if not decompressor.eof:
+                print(f"⚠️ Fin d'archive incomplète ignorée dans {self.archive_file}")
+                break
+            if on_payload is not None:
+                on_payload(b"".join(chunks))
+            valid_size = len(raw) - len(decompressor.unused_data)
+        return valid_size
+    
+    def _scan(self):
+        """Mesure la fin des membres complets si le fichier a changé (sans décoder le JSON)"""
+        stamp = self._disk_stamp()
+        if stamp != self._scan_stamp:
+            self._valid_size = self._walk() if stamp is not None else 0
+            self._scan_stamp = stamp
+    
+    def _load(self):
+        """Relit l'archive si elle a changé depuis la dernière lecture"""
+        stamp = self._disk_stamp()
+        if stamp == self._stamp:
+            return
+        bundles: Dict[int, Dict] = {}
+        
+        def parse(payload: bytes):
+            for line in payload.decode('utf-8').splitlines():
+                if line.strip():
+                    bundle = json.loads(line)
+                    bundles.pop(bundle["examen"]["id"], None)
+                    bundles[bundle["examen"]["id"]] = bundle
+        
+        self._valid_size = self._walk(parse) if stamp is not None else 0
+        self._scan_stamp = stamp
+        self._bundles = bundles
+        self._stamp = stamp
+    
+    def append(self, bundles: List[Dict]):
+        """Ajoute un lot d'examens archivés (un membre gzip, écrit sur disque avant de rendre la main)"""
+        if not bundles:
+            return
+        payload = "".join(json.dumps(bundle, ensure_ascii=False, separators=(',', ':')) + "\n"
+                          for bundle in bundles).encode('utf-8')
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+        member = compressor.compress(payload) + compressor.flush()
+        with self.lock:
+            self._scan()
+            with open(self.archive_file, 'ab') as f:
+                if f.tell() != self._valid_size:
+                    # Écarter un membre tronqué avant d'écrire à la suite
+                    f.truncate(self._valid_size)
+                    f.seek(self._valid_size)
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            self._valid_size += len(member)
+            self._scan_stamp = self._disk_stamp()
+            # Le cache des lectures est périmé : libéré, il ne sera refait qu'à la prochaine lecture
+            self._bundles = {}
+            self._stamp = None
+        print(f"🧊 {len(bundles)} examens ajoutés à {self.archive_file}")
+
+    def get_version(self) -> Optional[tuple]:
+        """Version de l'archive (empreinte du fichier), pour les ETag"""
+        return self._disk_stamp()
+
+    def bundles(self) -> List[Dict]:
+        """Tous les examens archivés (dans l'ordre d'archivage)"""
+        with self.lock:
+            self._load()
+            return list(self._bundles.values())
+
+    def get_bundle(self, examen_id: int) -> Optional[Dict]:
+        """Examen archivé complet (examen, cours, planning, scores)"""
+        with self.lock:
+            self._load()
+            return self._bundles.get(examen_id)
+
+    def get_examens(self) -> List[Dict]:
+        """Examens archivés, avec leur date d'archivage"""
+        return [{**bundle["examen"], "archive_le": bundle.get("archive_le")} for bundle in self.bundles()]
+
+    def get_cours(self, examen_id: Optional[int] = None) -> List[Dict]:
+        """Cours archivés, éventuellement ceux d'un examen"""
+        return [cours for bundle in self._select(examen_id) for cours in bundle.get("cours", [])]
+
+    def get_planning(self, examen_id: Optional[int] = None) -> List[Dict]:
+        """Planning archivé, éventuellement celui d'un examen"""
+        return [item for bundle in self._select(examen_id) for item in bundle.get("planning", [])]
+
+    def get_scores(self, cours_id: Optional[int] = None) -> List[Dict]:
+        """Scores archivés, éventuellement ceux d'un cours"""
+        return [score for bundle in self.bundles() for score in bundle.get("scores", [])
+                if cours_id is None or score.get("cours_id") == cours_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Volume de l'archive"""
+        bundles = self.bundles()
+        return {
+            "examens": len(bundles),
+            "cours": sum(len(bundle.get("cours", [])) for bundle in bundles),
+            "planning": sum(len(bundle.get("planning", [])) for bundle in bundles),
+            "scores": sum(len(bundle.get("scores", [])) for bundle in bundles),
+            "octets": self._valid_size
+        }
+
+    def _select(self, examen_id: Optional[int]) -> List[Dict]:
+        if examen_id is None:
+            return self.bundles()
+        bundle = self.get_bundle(examen_id)
+        return [bundle] if bundle else []
@@ -4,305 +4,1216 @@ Gestionnaire de données JSON pour RevisionCam
 Remplace complètement SQLite par un fichier JSON unique
 """
 
+import heapq
 import json
+import marshal
+import mmap
 import os
+import struct
+import sys
 import threading
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+import zlib
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import compress, repeat
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 
-class JSONDataManager:
-    """Gestionnaire de données JSON avec verrouillage thread-safe"""
+from storage_backend import RECORD_TABLES, StorageBackend, date_in_range, default_data, iso_to_ordinal, load_day, load_minutes, ordinal_to_iso
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+# Tables indexées par clé primaire (les autres sections restent dans `data`)
+TABLES = ("examens", "cours", "planning", "scores")
+
+# Sections qui composent la configuration du planning (voir get_config_version)
+CONFIG_SECTIONS = ("parametres", "bareme", "disponibilites")
+
+# Instantané binaire (voir _write_binary_snapshot) : signature, taille de l'en-tête, en-tête marshal
+SNAPSHOT_MAGIC = b"RCSNAP01"
+_SNAPSHOT_HEADER = struct.Struct("<8sI")
+# Le format marshal dépend de la version de Python : un instantané d'une autre version est ignoré
+SNAPSHOT_FORMAT = (1, marshal.version, tuple(sys.version_info[:2]))
+
+# Index secondaires maintenus pour chaque table
+SECONDARY_INDEXES = {
+    "examens": (),
+    "cours": ("examen_id",),
+    "planning": ("examen_id", "cours_id", "date_finale", "statut"),
+    "scores": ("cours_id",),
+}
+
+# Colonnes de la table du planning (voir _PlanningTable) et leur type
+PLANNING_COLUMNS = (
+    ("id", "int"),
+    ("cours_id", "int"),
+    ("examen_id", "int"),
+    ("jalon", "int"),
+    ("date_finale", "date"),
+    ("duree", "int"),
+    ("statut", "enum"),
+    ("type", "enum"),
+    ("priorite_indice", "int"),
+)
+_PLANNING_FIELD_NAMES = tuple(field for field, _ in PLANNING_COLUMNS)
+_PLANNING_FIELDS = frozenset(_PLANNING_FIELD_NAMES)
+# Valeurs énumérées codées d'avance (statuts et types usuels)
+PLANNING_SYMBOLS = ("À faire", "Fait", "Majeur", "Mineur")
+_INT_MISSING = -2 ** 63
+# Type de colonne → (code `array`, valeur réservée aux champs absents ou stockés à part)
+_COLUMN_TYPES = {
+    "int": ("q", _INT_MISSING),
+    "date": ("i", 0),
+    "enum": ("b", -1),
+}
+
+class _DailyLoad:
+    """Charge par jour (ordinal → nombre, minutes) des éléments de planning non 'Fait'"""
+    
+    def __init__(self):
+        self.by_date: Dict[int, List[int]] = {}
+    
+    @staticmethod
+    def contribution(record: Dict) -> Optional[tuple]:
+        """(jour, minutes) apportés par un enregistrement, None s'il ne compte pas (date absente ou non ISO)"""
+        if record.get("statut") == "Fait":
+            return None
+        day = load_day(record.get("date_finale"))
+        if day is None:
+            return None
+        return day, load_minutes(record.get("duree"))
+    
+    def add(self, day: int, duree: int):
+        totals = self.by_date.setdefault(day, [0, 0])
+        totals[0] += 1
+        totals[1] += duree
+    
+    def remove(self, day: int, duree: int):
+        totals = self.by_date[day]
+        totals[0] -= 1
+        totals[1] -= duree
+        if not totals[0]:
+            del self.by_date[day]
+
+class _Table:
+    """Table en mémoire indexée par clé primaire (id → enregistrement)
+    
+    Le dictionnaire conserve l'ordre d'insertion, qui est aussi l'ordre des
+    enregistrements dans le fichier JSON. Chaque champ de `indexed_fields`
+    dispose d'un index valeur → ids ; les valeurs indexées sont mémorisées à
+    l'insertion, ce qui garde l'index juste même si l'appelant a modifié
+    l'enregistrement en place avant de le mettre à jour. Les résultats d'un
+    index suivent l'ordre de la table.
+    """
+    
+    def __init__(self, name: str, indexed_fields: tuple = ()):
+        self.name = name
+        self.rows: Dict[int, Dict] = {}
+        self.indexed_fields = indexed_fields
+        self.indexes: Dict[str, Dict[Any, Dict[int, None]]] = {field: {} for field in indexed_fields}
+        self._keys: Dict[int, tuple] = {}
+        self._positions: Dict[int, int] = {}
+        self._next_position = 0
+        self._unordered: set = set()
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __contains__(self, record_id: int) -> bool:
+        return record_id in self.rows
+    
+    def ids(self) -> List[int]:
+        """Ids des enregistrements dans l'ordre de la table"""
+        return list(self.rows)
+    
+    def get(self, record_id: int) -> Optional[Dict]:
+        """Récupère un enregistrement par ID en O(1)"""
+        return self.rows.get(record_id)
+    
+    def all(self) -> List[Dict]:
+        """Récupère tous les enregistrements dans l'ordre d'insertion"""
+        return list(self.rows.values())
+    
+    def _records(self, record_ids) -> List[Dict]:
+        """Enregistrements correspondant à des ids existants"""
+        return [self.rows[record_id] for record_id in record_ids]
+    
+    def lookup(self, field: str, value: Any) -> List[Dict]:
+        """Récupère les enregistrements dont `field == value` via l'index secondaire"""
+        bucket = self.indexes[field].get(value)
+        if not bucket:
+            return []
+        if (field, value) in self._unordered:
+            # Un enregistrement a changé de valeur : remettre le seau dans l'ordre de la table
+            ordered = sorted(bucket, key=self._positions.__getitem__)
+            bucket = self.indexes[field][value] = dict.fromkeys(ordered)
+            self._unordered.discard((field, value))
+        return self._records(bucket)
+    
+    def lookup_excluding(self, field: str, value: Any) -> List[Dict]:
+        """Récupère les enregistrements dont `field != value`, dans l'ordre de la table"""
+        record_ids = [record_id for other, bucket in self.indexes[field].items() if other != value
+                      for record_id in bucket]
+        record_ids.sort(key=self._positions.__getitem__)
+        return self._records(record_ids)
+    
+    def put(self, record: Dict):
+        """Insère ou remplace l'enregistrement de même id (conserve sa position)"""
+        record_id = record["id"]
+        new_keys = tuple(record.get(field) for field in self.indexed_fields)
+        old_keys = self._keys.get(record_id)
+        if record_id not in self._positions:
+            self._positions[record_id] = self._next_position
+            self._next_position += 1
+        self._reindex(record_id, old_keys, new_keys)
+        self._keys[record_id] = new_keys
+        self.rows[record_id] = record
+    
+    def delete(self, record_id: int):
+        """Supprime un enregistrement et ses entrées d'index"""
+        if self.rows.pop(record_id, None) is None:
+            return
+        for field, old in zip(self.indexed_fields, self._keys.pop(record_id)):
+            self._unindex(field, old, record_id)
+        del self._positions[record_id]
+    
+    def delete_where(self, field: str, value: Any, keep_status: Optional[str] = None):
+        """Supprime les enregistrements dont `field == value`, sauf le statut conservé"""
+        if field == "id":
+            candidates = [value] if value in self else []
+        elif field in self.indexes:
+            candidates = list(self.indexes[field].get(value, ()))
+        else:
+            candidates = [row["id"] for row in self.all() if row.get(field) == value]
+        for record_id in candidates:
+            if keep_status is None or self.get(record_id).get("statut") != keep_status:
+                self.delete(record_id)
+    
+    def _reindex(self, record_id: int, old_keys: Optional[tuple], new_keys: tuple):
+        """Déplace un enregistrement dans les index dont la valeur a changé"""
+        for field, old, new in zip(self.indexed_fields, old_keys or (None,) * len(new_keys), new_keys):
+            if old_keys is not None and old == new:
+                continue
+            if old_keys is not None:
+                self._unindex(field, old, record_id)
+            self._index(field, new, record_id)
+    
+    def _index(self, field: str, value: Any, record_id: int):
+        bucket = self.indexes[field].setdefault(value, {})
+        if bucket and self._positions[next(reversed(bucket))] > self._positions[record_id]:
+            self._unordered.add((field, value))
+        bucket[record_id] = None
+    
+    def _unindex(self, field: str, value: Any, record_id: int):
+        bucket = self.indexes[field].get(value)
+        if bucket is not None:
+            bucket.pop(record_id, None)
+            if not bucket:
+                del self.indexes[field][value]
+                self._unordered.discard((field, value))
+
+class _PlanningTable(_Table):
+    """Table du planning stockée par colonnes
+    
+    Chaque champ de `PLANNING_COLUMNS` occupe un tableau typé (`array`) indexé
+    par emplacement : entiers sur 8 octets, dates en ordinaux, `statut` et
+    `type` codés dans une table de symboles commune. Une valeur absente ou qui
+    ne tient pas dans sa colonne (texte dans un champ entier, date non ISO...)
+    est conservée telle quelle à part, comme les champs hors schéma : le
+    dictionnaire reconstruit est identique à celui qui a été stocké, à l'ordre
+    des clés près. Les enregistrements ne sont matérialisés qu'à la lecture,
+    colonne par colonne, en dictionnaires neufs que l'appelant peut modifier.
+    Les agrégats (charge par jour, occupation) ignorent les dates non ISO et
+    comptent pour 0 une durée qui n'est pas un nombre.
+    
+    Les champs de `SCANNED_COLUMNS` n'ont pas d'index : leur colonne est
+    parcourue directement. Une suppression laisse un emplacement vide ; les
+    colonnes sont compactées quand les emplacements vides deviennent
+    majoritaires. La table tient aussi à jour la charge par jour
+    (`_DailyLoad`) des éléments non 'Fait'.
+    """
+    
+    SCANNED_COLUMNS = ("statut",)
+    
+    def __init__(self, name: str, indexed_fields: tuple = ()):
+        super().__init__(name, tuple(field for field in indexed_fields if field not in self.SCANNED_COLUMNS))
+        self.rows = None
+        self._keys = None
+        # id → emplacement ; l'ordre des emplacements est l'ordre de la table
+        self._slots: Dict[int, int] = self._positions
+        self._columns = {field: array(_COLUMN_TYPES[kind][0]) for field, kind in PLANNING_COLUMNS}
+        self._overflow: Dict[str, Dict[int, Any]] = {field: {} for field, _ in PLANNING_COLUMNS}
+        self._extras: Dict[int, Dict] = {}
+        # Emplacements dont un champ est absent ou stocké à part
+        self._irregular: set = set()
+        self._free: set = set()
+        self._symbols: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in PLANNING_SYMBOLS:
+            self._intern(value)
+        self.daily_load = _DailyLoad()
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def __contains__(self, record_id: int) -> bool:
+        return record_id in self._slots
+    
+    def ids(self) -> List[int]:
+        return list(self._slots)
+    
+    def get(self, record_id: int) -> Optional[Dict]:
+        slot = self._slots.get(record_id)
+        return None if slot is None else self._row(slot)
+    
+    def all(self) -> List[Dict]:
+        return self._materialize(list(self._slots.values()))
+    
+    def _records(self, record_ids) -> List[Dict]:
+        return self._materialize(list(map(self._slots.__getitem__, record_ids)))
+    
+    def lookup(self, field: str, value: Any) -> List[Dict]:
+        if field in self.SCANNED_COLUMNS:
+            return self._materialize(self._scan(field, value, True))
+        return super().lookup(field, value)
+    
+    def lookup_excluding(self, field: str, value: Any) -> List[Dict]:
+        if field in self.SCANNED_COLUMNS:
+            return self._materialize(self._scan(field, value, False))
+        return super().lookup_excluding(field, value)
+    
+    def put(self, record: Dict):
+        record_id = record["id"]
+        slot = self._slots.get(record_id)
+        if slot is None:
+            if self._free and len(self._free) * 2 > len(self._columns["id"]):
+                self._compact()
+            slot = len(self._columns["id"])
+            for field, kind in PLANNING_COLUMNS:
+                self._columns[field].append(_COLUMN_TYPES[kind][1])
+            self._slots[record_id] = slot
+            old = None
+        else:
+            old = self._row(slot)
+            contribution = _DailyLoad.contribution(old)
+            if contribution is not None:
+                self.daily_load.remove(*contribution)
+        regular = True
+        for field, kind in PLANNING_COLUMNS:
+            regular &= self._store(slot, field, kind, record)
+        extras = {key: value for key, value in record.items() if key not in _PLANNING_FIELDS}
+        if extras:
+            self._extras[slot] = extras
+        else:
+            self._extras.pop(slot, None)
+        if regular and not extras:
+            self._irregular.discard(slot)
+        else:
+            self._irregular.add(slot)
+        self._reindex(record_id, None if old is None else tuple(old.get(field) for field in self.indexed_fields),
+                      tuple(record.get(field) for field in self.indexed_fields))
+        contribution = _DailyLoad.contribution(record)
+        if contribution is not None:
+            self.daily_load.add(*contribution)
+    
+    def delete(self, record_id: int):
+        slot = self._slots.get(record_id)
+        if slot is None:
+            return
+        old = self._row(slot)
+        for field in self.indexed_fields:
+            self._unindex(field, old.get(field), record_id)
+        contribution = _DailyLoad.contribution(old)
+        if contribution is not None:
+            self.daily_load.remove(*contribution)
+        del self._slots[record_id]
+        for field, kind in PLANNING_COLUMNS:
+            self._columns[field][slot] = _COLUMN_TYPES[kind][1]
+            self._overflow[field].pop(slot, None)
+        self._extras.pop(slot, None)
+        self._irregular.discard(slot)
+        self._free.add(slot)
+    
+    def _intern(self, value: str) -> Optional[int]:
+        """Code d'une valeur énumérée (None si la table de symboles est pleine)"""
+        code = self._codes.get(value)
+        if code is None and len(self._symbols) < 127:
+            code = self._codes[value] = len(self._symbols)
+            self._symbols.append(value)
+        return code
+    
+    def _store(self, slot: int, field: str, kind: str, record: Dict) -> bool:
+        """Écrit la valeur d'un champ dans sa colonne ; False si elle est absente ou stockée à part"""
+        column, missing = self._columns[field], _COLUMN_TYPES[kind][1]
+        overflow = self._overflow[field]
+        overflow.pop(slot, None)
+        if field not in record:
+            column[slot] = missing
+            return False
+        value = record[field]
+        code = None
+        if kind == "int":
+            if type(value) is int and _INT_MISSING < value < 2 ** 63:
+                code = value
+        elif kind == "date":
+            if type(value) is str:
+                try:
+                    code = iso_to_ordinal(value)
+                except ValueError:
+                    code = None
+                if code is not None and ordinal_to_iso(code) != value:
+                    code = None
+        elif type(value) is str:
+            code = self._intern(value)
+        if code is None:
+            column[slot] = missing
+            overflow[slot] = value
+            return False
+        column[slot] = code
+        return True
+    
+    def _row(self, slot: int) -> Dict:
+        """Reconstruit l'enregistrement d'un emplacement"""
+        record = {}
+        for field, kind in PLANNING_COLUMNS:
+            code = self._columns[field][slot]
+            if code == _COLUMN_TYPES[kind][1]:
+                overflow = self._overflow[field]
+                if slot in overflow:
+                    record[field] = overflow[slot]
+            elif kind == "int":
+                record[field] = code
+            elif kind == "date":
+                record[field] = ordinal_to_iso(code)
+            else:
+                record[field] = self._symbols[code]
+        extras = self._extras.get(slot)
+        if extras:
+            record.update(extras)
+        return record
     
-    def __init__(self, json_file: str = "revisioncam.json"):
+    def _materialize(self, slots: List[int]) -> List[Dict]:
+        """Reconstruit des enregistrements colonne par colonne (les irréguliers un par un)"""
+        irregular = self._irregular
+        regular = [slot for slot in slots if slot not in irregular] if irregular else slots
+        columns = []
+        for field, kind in PLANNING_COLUMNS:
+            values = map(self._columns[field].__getitem__, regular)
+            if kind == "date":
+                values = map(ordinal_to_iso, values)
+            elif kind == "enum":
+                values = map(self._symbols.__getitem__, values)
+            columns.append(values)
+        rows = list(map(dict, map(zip, repeat(_PLANNING_FIELD_NAMES), zip(*columns))))
+        if len(regular) == len(slots):
+            return rows
+        regular_rows = iter(rows)
+        return [self._row(slot) if slot in irregular else next(regular_rows) for slot in slots]
+    
+    def pending_occupancy(self) -> List[tuple]:
+        """(id, cours_id, examen_id, jour ordinal, durée) des éléments non 'Fait', lus dans les colonnes"""
+        slots = self._scan("statut", "Fait", False)
+        irregular = self._irregular
+        regular = [slot for slot in slots if slot not in irregular] if irregular else slots
+        rows = list(zip(*(map(self._columns[field].__getitem__, regular)
+                          for field in ("id", "cours_id", "examen_id", "date_finale", "duree"))))
+        if len(regular) == len(slots):
+            return rows
+        regular_rows = iter(rows)
+        occupancy = []
+        for slot in slots:
+            if slot not in irregular:
+                occupancy.append(next(regular_rows))
+                continue
+            record = self._row(slot)
+            occupancy.append((record.get("id"), record.get("cours_id"), record.get("examen_id"),
+                              load_day(record.get("date_finale")), load_minutes(record.get("duree"))))
+        return occupancy
+    
+    def select(self, examen_id: Optional[int] = None, day_from: Optional[int] = None,
+               day_to: Optional[int] = None, statut: Optional[str] = None,
+               after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Filtre sur les colonnes et ne matérialise que les éléments retenus (voir get_planning_page)"""
+        if examen_id is not None:
+            slots = sorted(map(self._slots.__getitem__, self.indexes["examen_id"].get(examen_id, ())))
+        elif statut is not None:
+            slots = self._scan("statut", statut, True)
+        else:
+            slots = list(self._slots.values())
+        if statut is not None and examen_id is not None:
+            matching = set(self._scan("statut", statut, True))
+            slots = [slot for slot in slots if slot in matching]
+        if day_from is not None or day_to is not None:
+            column, overflow = self._columns["date_finale"], self._overflow["date_finale"]
+            # Ordinal 0 : date absente ou stockée à part (évaluée comme le ferait date_in_range)
+            low, high = day_from or 1, day_to or date.max.toordinal()
+            slots = [slot for slot in slots if low <= column[slot] <= high
+                     or (slot in overflow and date_in_range(overflow[slot], day_from, day_to))]
+        if after_id is not None or limit is not None:
+            ids = self._columns["id"]
+            keyed = [(ids[slot], slot) for slot in slots]
+            if after_id is not None:
+                keyed = [key for key in keyed if key[0] > after_id]
+            keyed = heapq.nsmallest(limit, keyed) if limit is not None else sorted(keyed)
+            slots = [slot for _, slot in keyed]
+        return self._materialize(slots)
+    
+    def export_slots(self, examen_id: Optional[int] = None) -> List[int]:
+        """Emplacements à exporter, dans l'ordre de la table (ceux d'un examen si précisé)"""
+        if examen_id is None:
+            return list(self._slots.values())
+        return sorted(map(self._slots.__getitem__, self.indexes["examen_id"].get(examen_id, ())))
+    
+    def frozen(self) -> "_PlanningTable":
+        """Copie des colonnes, lisible pendant que la table continue d'évoluer (index non copiés)"""
+        copy = _PlanningTable.__new__(_PlanningTable)
+        copy.__dict__.update(self.__dict__)
+        copy._slots = copy._positions = dict(self._slots)
+        copy._columns = {field: array(column.typecode, column) for field, column in self._columns.items()}
+        copy._overflow = {field: dict(values) for field, values in self._overflow.items()}
+        copy._extras = dict(self._extras)
+        copy._irregular = set(self._irregular)
+        copy._symbols = list(self._symbols)
+        return copy
+    
+    def iter_slots(self, slots: List[int], batch_size: int) -> Iterator[Dict]:
+        """Enregistrements des emplacements donnés, matérialisés par lots"""
+        for start in range(0, len(slots), batch_size):
+            yield from self._materialize(slots[start:start + batch_size])
+    
+    def _scan(self, field: str, value: Any, equal: bool) -> List[int]:
+        """Emplacements, dans l'ordre de la table, dont le champ énuméré vaut (ou non) `value`"""
+        column = self._columns[field]
+        code = self._codes.get(value) if type(value) is str else None
+        if code is not None:
+            # Une chaîne codée n'est jamais stockée à part : seule la colonne compte
+            slots = compress(range(len(column)), map(code.__eq__ if equal else code.__ne__, column))
+            if equal or not self._free:
+                return list(slots)
+            return [slot for slot in slots if slot not in self._free]
+        missing, overflow, symbols = _COLUMN_TYPES["enum"][1], self._overflow[field], self._symbols
+        return [slot for slot, code in enumerate(column) if slot not in self._free
+                and ((overflow.get(slot) if code == missing else symbols[code]) == value) == equal]
+    
+    def _compact(self):
+        """Retire les emplacements vides en gardant l'ordre de la table"""
+        live = list(self._slots.values())
+        remap = {old: new for new, old in enumerate(live)}
+        for field, _ in PLANNING_COLUMNS:
+            column = self._columns[field]
+            self._columns[field] = array(column.typecode, map(column.__getitem__, live))
+            self._overflow[field] = {remap[old]: value for old, value in self._overflow[field].items()}
+        self._extras = {remap[old]: extras for old, extras in self._extras.items()}
+        self._irregular = {remap[old] for old in self._irregular}
+        for record_id, old in list(self._slots.items()):
+            self._slots[record_id] = remap[old]
+        self._free = set()
+
+class _SnapshotTables(dict):
+    """Tables décodées à la demande depuis un instantané binaire projeté en mémoire (mmap)
+    
+    Chaque table est une section marshal indépendante : seule celle demandée est
+    décodée, puis la projection est fermée une fois toutes les tables chargées.
+    """
+    
+    def __init__(self, snapshot_map: mmap.mmap, sections: Dict[str, tuple], build, lock):
+        super().__init__()
+        self._map = snapshot_map
+        self._sections = sections
+        self._build = build
+        self._lock = lock
+    
+    def __missing__(self, name: str) -> _Table:
+        if name not in self._sections:
+            raise KeyError(name)
+        with self._lock:
+            if not dict.__contains__(self, name):
+                offset, length = self._sections[name]
+                self[name] = self._build(name, marshal.loads(self._map[offset:offset + length]))
+                if all(dict.__contains__(self, table) for table in TABLES):
+                    self._map.close()
+            return dict.__getitem__(self, name)
+
+class JSONDataManager(StorageBackend):
+    """Gestionnaire de données JSON avec verrouillage thread-safe
+    
+    En mode journalisé, chaque mutation est ajoutée sous forme d'enregistrement
+    compact à la fin de `<json_file>.journal` ; le fichier JSON complet n'est
+    réécrit qu'aux points de contrôle (checkpoints). Au démarrage, le journal est
+    rejoué par-dessus le dernier instantané.
+    
+    Les mutations effectuées dans `transaction()` sont persistées en une seule
+    écriture à la sortie du bloc, ou annulées si une exception survient.
+    
+    En mode partagé (plusieurs workers gunicorn sur le même fichier), chaque
+    transaction prend un verrou `flock` exclusif sur `<json_file>.lock` et
+    recharge d'abord ce qu'un autre processus a pu écrire ; `refresh()` permet
+    aux lectures de détecter ces écritures à moindre coût (inode, taille, mtime).
+    
+    Avec l'instantané binaire, chaque point de contrôle écrit aussi
+    `<json_file>.snap` (sections marshal). Au démarrage, s'il correspond au
+    fichier JSON, il remplace l'analyse du JSON : il est projeté en mémoire et
+    chaque table n'est décodée qu'à son premier accès.
+    """
+    
+    def __init__(self, json_file: str = "revisioncam.json", journal: Optional[bool] = None,
+                 checkpoint_every: Optional[int] = None, shared: Optional[bool] = None,
+                 binary_snapshot: Optional[bool] = None):
         self.json_file = json_file
+        self.journal_file = f"{json_file}.journal"
+        self.lock_file = f"{json_file}.lock"
+        self.snapshot_file = f"{json_file}.snap"
+        if journal is None:
+            journal = os.environ.get("REVISIONCAM_JOURNAL", "0") == "1"
+        if binary_snapshot is None:
+            binary_snapshot = os.environ.get("REVISIONCAM_SNAPSHOT", "0") == "1"
+        if shared is None:
+            shared = os.environ.get("REVISIONCAM_SHARED", "0") == "1"
+        if shared and fcntl is None:
+            print("⚠️ Mode partagé indisponible sur cette plateforme (fcntl absent)")
+            shared = False
+        if checkpoint_every is None:
+            checkpoint_every = int(os.environ.get("REVISIONCAM_CHECKPOINT_EVERY", "500"))
+        self.journal_enabled = journal
+        self.shared = shared
+        self.binary_snapshot = binary_snapshot
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._stamp = None
+        self._lock_handle = None
+        self._lock_pid = None
+        self._pending_ops: Optional[List[list]] = None
+        self._config_version = 0
+        self._rollbacks = 0
+        self._from_binary = False
+        self.lock = threading.RLock()
+        self.tables: Dict[str, _Table] = {}
         self.data = self._load_default_data()
-        self.lock = threading.Lock()
-        self._load_data()
+        self._build_tables()
+        with self._file_lock():
+            self._load_data()
     
-    def _load_default_data(self) -> Dict[str, Any]:
+    @staticmethod
+    def _load_default_data() -> Dict[str, Any]:
         """Structure par défaut du fichier JSON"""
-        return {
-            "examens": [],
-            "cours": [],
-            "planning": [],
-            "scores": [],
-            "parametres": {
-                "duree_min": 30,
-                "duree_max": 60,
-                "nb_max_par_j": 4,
-                "nb_min_par_j": 1,
-                "bonus_ok": 2,
-                "bonus_fail": 1,
-                "seuil_ok": 85,
-                "seuil_fail": 60,
-                "temps_pause": 15
-            },
-            "bareme": [
-                {"indice": 0, "nb_revisions": 1},
-                {"indice": 1, "nb_revisions": 2},
-                {"indice": 2, "nb_revisions": 3},
-                {"indice": 3, "nb_revisions": 4},
-                {"indice": 4, "nb_revisions": 5},
-                {"indice": 5, "nb_revisions": 6},
-                {"indice": 6, "nb_revisions": 7},
-                {"indice": 7, "nb_revisions": 8},
-                {"indice": 8, "nb_revisions": 9},
-                {"indice": 9, "nb_revisions": 10},
-                {"indice": 10, "nb_revisions": 11}
-            ],
-            "disponibilites": [
-                {"jour": "lundi", "minutes": 480},
-                {"jour": "mardi", "minutes": 480},
-                {"jour": "mercredi", "minutes": 480},
-                {"jour": "jeudi", "minutes": 480},
-                {"jour": "vendredi", "minutes": 480},
-                {"jour": "samedi", "minutes": 300},
-                {"jour": "dimanche", "minutes": 240}
-            ]
-        }
+        return default_data()
     
     def _load_data(self):
-        """Charge les données depuis le fichier JSON"""
+        """Charge les données depuis le fichier JSON puis rejoue le journal"""
         try:
             if os.path.exists(self.json_file):
-                with open(self.json_file, 'r', encoding='utf-8') as f:
-                    loaded_data = json.load(f)
-                    # Fusionner avec les données par défaut pour les nouvelles clés
-                    for key, default_value in self.data.items():
-                        if key not in loaded_data:
-                            loaded_data[key] = default_value
-                    self.data = loaded_data
-                print(f"✅ Données chargées depuis {self.json_file}")
+                replayed = self._read_state()
+                print(f"✅ Données chargées depuis {self.snapshot_file if self._from_binary else self.json_file}")
+                if replayed:
+                    print(f"📜 {replayed} enregistrements rejoués depuis {self.journal_file}")
+                    self._save_data()
+                elif self.binary_snapshot and not self._from_binary:
+                    # Instantané absent ou périmé : le prochain démarrage n'analysera plus le JSON
+                    self._write_binary_snapshot(self._snapshot())
             else:
                 self._save_data()
                 print(f"✅ Fichier {self.json_file} créé avec les données par défaut")
         except Exception as e:
-            print(f"❌ Erreur lors du chargement: {e}")
-            self.data = self._load_default_data()
-            self._save_data()
+            # Ne jamais remplacer un fichier illisible par les données par défaut
+            print(f"❌ Erreur lors du chargement de {self.json_file}, fichier laissé intact: {e}")
+            raise
+    
+    def _read_state(self) -> int:
+        """Lit l'instantané (binaire s'il est à jour, sinon JSON) et rejoue le journal, sans rien écrire"""
+        self._from_binary = self._read_binary_snapshot()
+        if not self._from_binary:
+            with open(self.json_file, 'r', encoding='utf-8') as f:
+                loaded_data = json.load(f)
+            # Fusionner avec les données par défaut pour les nouvelles clés
+            for key, default_value in self._load_default_data().items():
+                if key not in loaded_data:
+                    loaded_data[key] = default_value
+            self.data = loaded_data
+            self._build_tables()
+        self._journal_records = self._replay_journal()
+        self._stamp = self._disk_stamp()
+        return self._journal_records
     
     def _save_data(self):
-        """Sauvegarde les données dans le fichier JSON"""
+        """Sauvegarde les données dans le fichier JSON (point de contrôle)
+        
+        L'écriture passe par un fichier temporaire remplacé atomiquement, puis le
+        journal est vidé : un arrêt brutal laisse toujours soit l'ancien, soit le
+        nouvel instantané, et les opérations du journal sont idempotentes.
+        """
         try:
             with self.lock:
-                with open(self.json_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.data, f, indent=2, ensure_ascii=False)
+                snapshot = self._snapshot()
+                tmp_file = f"{self.json_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.json_file)
+                if os.path.exists(self.journal_file):
+                    os.remove(self.journal_file)
+                self._journal_records = 0
+                self._journal_offset = 0
+                self._stamp = self._disk_stamp()
                 print(f"💾 Données sauvegardées dans {self.json_file}")
+                if self.binary_snapshot:
+                    self._write_binary_snapshot(snapshot)
         except Exception as e:
             print(f"❌ Erreur lors de la sauvegarde: {e}")
     
+    def _write_binary_snapshot(self, snapshot: Dict[str, Any]):
+        """Écrit l'instantané binaire correspondant au fichier JSON courant
+        
+        Une section marshal par table plus une pour les autres sections ; l'en-tête
+        garde l'empreinte du fichier JSON, si bien qu'un JSON modifié ou remplacé
+        sans instantané rend celui-ci caduc. L'écriture est atomique.
+        """
+        try:
+            sections = [(name, marshal.dumps(snapshot[name])) for name in TABLES]
+            sections.append(("data", marshal.dumps({key: value for key, value in snapshot.items()
+                                                    if key not in TABLES})))
+            # Les décalages dépendent de la taille de l'en-tête : on le calcule jusqu'à stabilité
+            header, previous = b"", None
+            while header != previous:
+                previous = header
+                offset = _SNAPSHOT_HEADER.size + len(header)
+                directory = {}
+                for name, payload in sections:
+                    directory[name] = (offset, len(payload))
+                    offset += len(payload)
+                header = marshal.dumps({"format": SNAPSHOT_FORMAT, "source": self._disk_stamp()[0],
+                                        "sections": directory})
+            tmp_file = f"{self.snapshot_file}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(header)))
+                f.write(header)
+                for _, payload in sections:
+                    f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+        except Exception as e:
+            print(f"❌ Erreur lors de l'écriture de l'instantané binaire: {e}")
+    
+    def _read_binary_snapshot(self) -> bool:
+        """Ouvre l'instantané binaire s'il correspond au fichier JSON (tables décodées à la demande)"""
+        if not self.binary_snapshot:
+            return False
+        try:
+            with open(self.snapshot_file, 'rb') as f:
+                snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        try:
+            magic, header_size = _SNAPSHOT_HEADER.unpack_from(snapshot_map)
+            header = marshal.loads(snapshot_map[_SNAPSHOT_HEADER.size:_SNAPSHOT_HEADER.size + header_size])
+            if (magic != SNAPSHOT_MAGIC or header["format"] != SNAPSHOT_FORMAT
+                    or header["source"] != self._disk_stamp()[0]):
+                raise ValueError("instantané périmé")
+            offset, length = header["sections"]["data"]
+            data = marshal.loads(snapshot_map[offset:offset + length])
+        except (ValueError, EOFError, TypeError, KeyError, struct.error):
+            snapshot_map.close()
+            return False
+        self.data = data
+        self._config_version += 1
+        self.tables = _SnapshotTables(snapshot_map, header["sections"], self._load_table, self.lock)
+        return True
+    
+    def _load_table(self, name: str, rows: List[Dict]) -> _Table:
+        """Construit une table décodée depuis l'instantané binaire"""
+        return self._build_table(name, rows, self.data["sequences"])
+    
+    def _build_tables(self):
+        """Construit les tables indexées à partir des listes de `data`
+        
+        Les enregistrements sans id ou dont l'id est déjà pris reçoivent un
+        nouvel id, sinon ils seraient inaccessibles par clé primaire. Les
+        séquences d'ids sont migrées depuis le plus grand id existant.
+        """
+        sequences = self.data.get("sequences")
+        if not isinstance(sequences, dict):
+            sequences = self.data["sequences"] = {}
+        parametres = self.data.get("parametres")
+        if isinstance(parametres, list):
+            # Ancien format [{cle, valeur}] : converti une fois pour toutes
+            self.data["parametres"] = {param["cle"]: param["valeur"] for param in parametres
+                                       if isinstance(param, dict) and "cle" in param and "valeur" in param}
+        if not isinstance(self.data.get("versions"), dict):
+            self.data["versions"] = {}
+        self._config_version += 1
+        self.tables = {name: self._build_table(name, self.data.pop(name, None) or [], sequences)
+                       for name in TABLES}
+    
+    @staticmethod
+    def _build_table(name: str, rows: List[Dict], sequences: Dict[str, int]) -> _Table:
+        """Construit une table indexée (renumérote les ids manquants ou en double)"""
+        table = (_PlanningTable if name == "planning" else _Table)(name, SECONDARY_INDEXES[name])
+        orphans = []
+        for row in rows:
+            record_id = row.get("id")
+            if isinstance(record_id, int) and record_id not in table:
+                table.put(row)
+            else:
+                orphans.append(row)
+        last_id = max(int(sequences.get(name, 0)), max(table.ids(), default=0))
+        for row in orphans:
+            last_id += 1
+            row["id"] = last_id
+            table.put(row)
+        sequences[name] = last_id
+        if orphans:
+            print(f"⚠️ {len(orphans)} enregistrements de '{name}' sans id valide renumérotés")
+        return table
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """Reconstruit le document JSON complet (tables puis autres sections)"""
+        snapshot: Dict[str, Any] = {name: self.tables[name].all() for name in TABLES}
+        snapshot.update(self.data)
+        return snapshot
+    
+    # === TRANSACTIONS ===
+    @contextmanager
+    def transaction(self):
+        """Regroupe les mutations du bloc en une seule écriture
+        
+        En cas d'exception, les modifications en mémoire sont abandonnées en
+        relisant l'état persisté. Les transactions imbriquées rejoignent la
+        transaction englobante.
+        """
+        with self.lock:
+            if self._pending_ops is not None:
+                yield self
+                return
+            with self._file_lock():
+                self._reload_if_changed()
+                self._pending_ops = []
+                try:
+                    yield self
+                except BaseException:
+                    self._pending_ops = None
+                    self._rollback()
+                    raise
+                ops, self._pending_ops = self._pending_ops, None
+                if ops:
+                    self._persist(ops)
+    
+    def _rollback(self):
+        """Abandonne les modifications non persistées"""
+        # Les versions relues du disque pourront être réattribuées à un autre état
+        self._rollbacks += 1
+        try:
+            if os.path.exists(self.json_file):
+                self._read_state()
+            else:
+                self.data = self._load_default_data()
+                self._build_tables()
+            print("↩️ Transaction annulée, données rechargées")
+        except Exception as e:
+            print(f"❌ Erreur lors de l'annulation: {e}")
+    
+    # === COHÉRENCE ENTRE PROCESSUS ===
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """Verrou consultatif inter-processus (flock) ; sans effet hors mode partagé"""
+        if not self.shared:
+            yield
+            return
+        if self._lock_handle is None or self._lock_pid != os.getpid():
+            # Après un fork, le descripteur hérité serait partagé avec le parent
+            self._lock_handle = open(self.lock_file, 'a+')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_UN)
+    
+    def _disk_stamp(self) -> tuple:
+        """Empreinte peu coûteuse de l'état sur disque (instantané et journal)"""
+        try:
+            st = os.stat(self.json_file)
+            snapshot = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            snapshot = None
+        try:
+            st = os.stat(self.journal_file)
+            journal = (st.st_ino, st.st_size)
+        except OSError:
+            journal = None
+        return snapshot, journal
+    
+    def refresh(self) -> bool:
+        """Recharge les données si un autre processus a écrit depuis notre dernière lecture"""
+        if not self.shared:
+            return False
+        with self.lock:
+            if self._pending_ops is not None or self._disk_stamp() == self._stamp:
+                return False
+            with self._file_lock(exclusive=False):
+                return self._reload_if_changed()
+    
+    def _reload_if_changed(self) -> bool:
+        """Intègre les écritures d'autres processus (verrou de fichier déjà pris)"""
+        if not self.shared:
+            return False
+        stamp = self._disk_stamp()
+        if stamp == self._stamp:
+            return False
+        snapshot, journal = stamp
+        old_snapshot, old_journal = self._stamp or (None, None)
+        if (snapshot == old_snapshot and journal is not None
+                and (old_journal is None or journal[0] == old_journal[0])
+                and journal[1] >= self._journal_offset):
+            # Seul le journal a grandi : rejouer uniquement la fin
+            self._journal_records += self._replay_journal(self._journal_offset)
+            self._stamp = self._disk_stamp()
+        else:
+            self._read_state()
+        print(f"🔄 Données rechargées depuis le disque (écriture d'un autre processus)")
+        return True
+    
+    # === JOURNAL DES MUTATIONS ===
+    def _commit(self, ops: List[list]):
+        """Applique des opérations en mémoire puis les persiste
+        
+        Les opérations d'un même appel (ou d'une même transaction) forment un seul
+        enregistrement du journal, elles sont donc rejouées ensemble ou pas du tout.
+        """
+        with self.transaction():
+            for op in ops:
+                self._apply_op(op)
+            self._pending_ops.extend(ops)
+    
+    def _persist(self, ops: List[list]):
+        """Écrit des opérations déjà appliquées (journal ou instantané complet)"""
+        with self.lock:
+            if not self.journal_enabled:
+                self._save_data()
+                return
+            try:
+                self._append_journal(ops)
+            except Exception as e:
+                print(f"❌ Erreur lors de l'écriture du journal: {e}")
+                self._save_data()
+                return
+            if self._journal_records >= self.checkpoint_every:
+                self._save_data()
+    
+    def _append_journal(self, ops: List[list]):
+        """Ajoute un enregistrement `<crc32> <json>` à la fin du journal"""
+        payload = json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        line = b"%08x %s\n" % (zlib.crc32(payload), payload)
+        with open(self.journal_file, 'ab') as f:
+            if f.tell() != self._journal_offset:
+                # Écarter une fin d'enregistrement tronquée avant d'écrire à la suite
+                f.truncate(self._journal_offset)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_records += 1
+        self._journal_offset += len(line)
+        self._stamp = self._disk_stamp()
+    
+    def _replay_journal(self, offset: int = 0) -> int:
+        """Rejoue le journal à partir de `offset`, s'arrête au premier enregistrement incomplet"""
+        self._journal_offset = offset
+        if not os.path.exists(self.journal_file):
+            return 0
+        replayed = 0
+        with open(self.journal_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    print(f"⚠️ Enregistrement tronqué ignoré dans {self.journal_file}")
+                    break
+                crc, _, payload = line.rstrip(b'\n').partition(b' ')
+                try:
+                    if int(crc, 16) != zlib.crc32(payload):
+                        raise ValueError("crc invalide")
+                    ops = json.loads(payload)
+                except ValueError:
+                    print(f"⚠️ Enregistrement corrompu ignoré dans {self.journal_file}")
+                    break
+                for op in ops:
+                    self._apply_op(op)
+                replayed += 1
+                self._journal_offset += len(line)
+        return replayed
+    
+    def _apply_op(self, op: list):
+        """Applique une opération du journal aux données en mémoire
+        
+        Opérations (toutes idempotentes) :
+        - ["ins", table, record] : insère ou remplace l'enregistrement de même id
+        - ["upd", table, id, record] : remplace l'enregistrement d'id donné
+        - ["del", table, champ, valeur, statut_conserve] : supprime les enregistrements
+          dont `champ == valeur`, sauf ceux dont le statut vaut `statut_conserve`
+        - ["set", cle, valeur] : remplace une section complète (paramètres, barème...)
+        """
+        kind = op[0]
+        if kind == "ins":
+            _, table, record = op
+            self.tables[table].put(record)
+            sequences = self.data["sequences"]
+            if record["id"] > sequences.get(table, 0):
+                sequences[table] = record["id"]
+        elif kind == "upd":
+            _, table, record_id, record = op
+            if self.tables[table].get(record_id) is not None:
+                record["id"] = record_id
+                self.tables[table].put(record)
+        elif kind == "del":
+            _, table, field, value, keep_status = op
+            self.tables[table].delete_where(field, value, keep_status)
+        elif kind == "set":
+            _, table, value = op
+            self.data[table] = value
+            if table in CONFIG_SECTIONS:
+                self._config_version += 1
+                table = "config"
+        else:
+            raise ValueError(f"Opération de journal inconnue: {kind}")
+        # Après la modification : une version lue ne précède jamais les données qu'elle décrit
+        self._bump_version(table)
+    
+    def _bump_version(self, key: str):
+        """Incrémente la version d'une table ou de la configuration (rejouée à l'identique par le journal)"""
+        versions = self.data["versions"]
+        versions[key] = versions.get(key, 0) + 1
+    
     def _get_next_id(self, table: str) -> int:
-        """Génère le prochain ID pour une table"""
-        if table not in self.data:
-            return 1
-        if not self.data[table]:
-            return 1
-        return max(item.get('id', 0) for item in self.data[table]) + 1
+        """Génère le prochain ID pour une table (jamais un id déjà attribué)"""
+        return self.data["sequences"].get(table, 0) + 1
+    
+    def _insert_ops(self, table: str, records: List[Dict]) -> List[list]:
+        """Attribue des ids consécutifs à des enregistrements et prépare leurs insertions"""
+        next_id = self._get_next_id(table)
+        ops = []
+        for offset, record in enumerate(records):
+            record["id"] = next_id + offset
+            ops.append(["ins", table, record])
+        return ops
     
     # === MÉTHODES POUR LES EXAMENS ===
     def get_examens(self) -> List[Dict]:
         """Récupère tous les examens"""
-        return self.data.get("examens", [])
+        return self.tables["examens"].all()
     
     def get_examen(self, exam_id: int) -> Optional[Dict]:
         """Récupère un examen par ID"""
-        for exam in self.data.get("examens", []):
-            if exam.get("id") == exam_id:
-                return exam
-        return None
+        return self.tables["examens"].get(exam_id)
     
     def create_examen(self, exam_data: Dict) -> Dict:
         """Crée un nouvel examen"""
-        exam_data["id"] = self._get_next_id("examens")
-        self.data["examens"].append(exam_data)
-        self._save_data()
+        with self.transaction():
+            exam_data["id"] = self._get_next_id("examens")
+            self._commit([["ins", "examens", exam_data]])
         return exam_data
     
     def update_examen(self, exam_id: int, exam_data: Dict) -> bool:
         """Met à jour un examen"""
-        for i, exam in enumerate(self.data["examens"]):
-            if exam.get("id") == exam_id:
-                exam_data["id"] = exam_id
-                self.data["examens"][i] = exam_data
-                self._save_data()
-                return True
-        return False
+        with self.transaction():
+            if self.get_examen(exam_id) is None:
+                return False
+            exam_data["id"] = exam_id
+            self._commit([["upd", "examens", exam_id, exam_data]])
+        return True
     
     def delete_examen(self, exam_id: int) -> bool:
         """Supprime un examen et ses données liées"""
-        # Supprimer l'examen
-        self.data["examens"] = [e for e in self.data["examens"] if e.get("id") != exam_id]
-        
-        # Supprimer les cours liés
-        cours_to_delete = [c["id"] for c in self.data["cours"] if c.get("examen_id") == exam_id]
-        self.data["cours"] = [c for c in self.data["cours"] if c.get("examen_id") != exam_id]
-        
-        # Supprimer le planning lié
-        self.data["planning"] = [p for p in self.data["planning"] if p.get("examen_id") != exam_id]
-        
-        # Supprimer les scores liés
-        for cours_id in cours_to_delete:
-            self.data["scores"] = [s for s in self.data["scores"] if s.get("cours_id") != cours_id]
-        
-        self._save_data()
+        with self.transaction():
+            cours_to_delete = [c["id"] for c in self.get_cours(exam_id)]
+            ops = [
+                # Supprimer l'examen, les cours et le planning liés
+                ["del", "examens", "id", exam_id, None],
+                ["del", "cours", "examen_id", exam_id, None],
+                ["del", "planning", "examen_id", exam_id, None],
+            ]
+            # Supprimer les scores liés
+            for cours_id in cours_to_delete:
+                ops.append(["del", "scores", "cours_id", cours_id, None])
+            
+            self._commit(ops)
         return True
     
     # === MÉTHODES POUR LES COURS ===
     def get_cours(self, examen_id: Optional[int] = None) -> List[Dict]:
         """Récupère tous les cours ou ceux d'un examen spécifique"""
-        cours = self.data.get("cours", [])
         if examen_id is not None:
-            cours = [c for c in cours if c.get("examen_id") == examen_id]
-        return cours
+            return self.tables["cours"].lookup("examen_id", examen_id)
+        return self.tables["cours"].all()
     
     def get_cours_by_id(self, cours_id: int) -> Optional[Dict]:
         """Récupère un cours par ID"""
-        for cours in self.data.get("cours", []):
-            if cours.get("id") == cours_id:
-                return cours
-        return None
+        return self.tables["cours"].get(cours_id)
     
     def create_cours(self, cours_data: Dict) -> Dict:
         """Crée un nouveau cours"""
-        cours_data["id"] = self._get_next_id("cours")
-        self.data["cours"].append(cours_data)
-        self._save_data()
+        with self.transaction():
+            cours_data["id"] = self._get_next_id("cours")
+            self._commit([["ins", "cours", cours_data]])
         return cours_data
     
     def update_cours(self, cours_id: int, cours_data: Dict) -> bool:
         """Met à jour un cours"""
-        for i, cours in enumerate(self.data["cours"]):
-            if cours.get("id") == cours_id:
-                cours_data["id"] = cours_id
-                self.data["cours"][i] = cours_data
-                self._save_data()
-                return True
-        return False
+        with self.transaction():
+            if self.get_cours_by_id(cours_id) is None:
+                return False
+            cours_data["id"] = cours_id
+            self._commit([["upd", "cours", cours_id, cours_data]])
+        return True
     
     def delete_cours(self, cours_id: int) -> bool:
         """Supprime un cours et ses données liées"""
-        # Supprimer le cours
-        self.data["cours"] = [c for c in self.data["cours"] if c.get("id") != cours_id]
-        
-        # Supprimer le planning lié
-        self.data["planning"] = [p for p in self.data["planning"] if p.get("cours_id") != cours_id]
-        
-        # Supprimer les scores liés
-        self.data["scores"] = [s for s in self.data["scores"] if s.get("cours_id") != cours_id]
-        
-        self._save_data()
+        self._commit([
+            ["del", "cours", "id", cours_id, None],
+            ["del", "planning", "cours_id", cours_id, None],
+            ["del", "scores", "cours_id", cours_id, None],
+        ])
         return True
     
     # === MÉTHODES POUR LE PLANNING ===
     def get_planning(self, examen_id: Optional[int] = None) -> List[Dict]:
         """Récupère le planning, optionnellement filtré par examen"""
-        planning = self.data.get("planning", [])
         if examen_id is not None:
-            planning = [p for p in planning if p.get("examen_id") == examen_id]
-        return planning
+            return self.tables["planning"].lookup("examen_id", examen_id)
+        return self.tables["planning"].all()
+    
+    def get_planning_page(self, examen_id: Optional[int] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None, statut: Optional[str] = None,
+                          after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Page du planning filtrée sur les colonnes et les index (seule la page est matérialisée)"""
+        return self.tables["planning"].select(
+            examen_id, iso_to_ordinal(date_from) if date_from else None,
+            iso_to_ordinal(date_to) if date_to else None, statut, after_id, limit)
+    
+    def get_planning_by_course(self, cours_id: int, jalon_min: Optional[int] = None,
+                               statut: Optional[str] = None) -> List[Dict]:
+        """Récupère le planning d'un cours, optionnellement après un jalon et pour un statut"""
+        items = self.tables["planning"].lookup("cours_id", cours_id)
+        if jalon_min is not None:
+            items = [p for p in items if p.get("jalon", 0) > jalon_min]
+        if statut is not None:
+            items = [p for p in items if p.get("statut") == statut]
+        return items
+    
+    def get_planning_by_date(self, date_finale: str, exclude_statut: Optional[str] = "Fait") -> List[Dict]:
+        """Récupère les éléments d'une date (par défaut ceux qui ne sont pas 'Fait')"""
+        items = self.tables["planning"].lookup("date_finale", date_finale)
+        if exclude_statut is not None:
+            items = [p for p in items if p.get("statut") != exclude_statut]
+        return items
+    
+    def get_planning_by_statut(self, statut: str) -> List[Dict]:
+        """Récupère les éléments de planning ayant un statut donné"""
+        return self.tables["planning"].lookup("statut", statut)
+    
+    def get_pending_planning(self) -> List[Dict]:
+        """Récupère les éléments de planning qui ne sont pas 'Fait'"""
+        return self.tables["planning"].lookup_excluding("statut", "Fait")
+    
+    def get_pending_occupancy(self) -> List[tuple]:
+        """Occupation des éléments non 'Fait', sans reconstruire les enregistrements"""
+        return self.tables["planning"].pending_occupancy()
+    
+    def get_daily_load(self) -> Dict[int, Dict[str, int]]:
+        """Récupère la charge par jour (ordinal) des éléments non 'Fait' (ordre chronologique)"""
+        by_date = self.tables["planning"].daily_load.by_date
+        return {date_key: {"count": count, "duration": duration}
+                for date_key, (count, duration) in sorted(by_date.items())}
+    
+    def find_planning_item(self, cours_id: int, jalon: Any) -> Optional[Dict]:
+        """Récupère le premier élément de planning d'un cours pour un jalon"""
+        for item in self.tables["planning"].lookup("cours_id", cours_id):
+            if item.get("jalon") == jalon:
+                return item
+        return None
     
     def create_planning_item(self, planning_data: Dict) -> Dict:
         """Crée un nouvel élément de planning"""
-        planning_data["id"] = self._get_next_id("planning")
-        self.data["planning"].append(planning_data)
-        self._save_data()
+        with self.transaction():
+            planning_data["id"] = self._get_next_id("planning")
+            self._commit([["ins", "planning", planning_data]])
         return planning_data
     
+    def create_planning_items(self, items: List[Dict]) -> List[Dict]:
+        """Crée plusieurs éléments de planning en une seule écriture"""
+        with self.transaction():
+            self._commit(self._insert_ops("planning", items))
+        return items
+    
+    def replace_planning_for_exam(self, examen_id: int, items: List[Dict], keep_status: str = None) -> List[Dict]:
+        """Remplace le planning d'un examen (sauf le statut conservé) en une seule écriture"""
+        with self.transaction():
+            ops = [["del", "planning", "examen_id", examen_id, keep_status or None]]
+            ops.extend(self._insert_ops("planning", items))
+            self._commit(ops)
+        return items
+    
     def update_planning_item(self, planning_id: int, planning_data: Dict) -> bool:
         """Met à jour un élément de planning"""
-        for i, item in enumerate(self.data["planning"]):
-            if item.get("id") == planning_id:
-                planning_data["id"] = planning_id
-                self.data["planning"][i] = planning_data
-                self._save_data()
-                return True
-        return False
+        with self.transaction():
+            if self.tables["planning"].get(planning_id) is None:
+                return False
+            planning_data["id"] = planning_id
+            self._commit([["upd", "planning", planning_id, planning_data]])
+        return True
     
     def delete_planning_item(self, planning_id: int) -> bool:
         """Supprime un élément de planning"""
-        self.data["planning"] = [p for p in self.data["planning"] if p.get("id") != planning_id]
-        self._save_data()
+        self._commit([["del", "planning", "id", planning_id, None]])
         return True
     
     def clear_planning_for_exam(self, examen_id: int, keep_status: str = None):
         """Supprime le planning d'un examen, optionnellement en gardant certains statuts"""
-        if keep_status:
-            self.data["planning"] = [
-                p for p in self.data["planning"] 
-                if p.get("examen_id") != examen_id or p.get("statut") == keep_status
-            ]
-        else:
-            self.data["planning"] = [p for p in self.data["planning"] if p.get("examen_id") != examen_id]
-        self._save_data()
+        self._commit([["del", "planning", "examen_id", examen_id, keep_status or None]])
     
     # === MÉTHODES POUR LES SCORES ===
     def get_scores(self, cours_id: Optional[int] = None) -> List[Dict]:
         """Récupère tous les scores ou ceux d'un cours spécifique"""
-        scores = self.data.get("scores", [])
         if cours_id is not None:
-            scores = [s for s in scores if s.get("cours_id") == cours_id]
-        return scores
+            return self.tables["scores"].lookup("cours_id", cours_id)
+        return self.tables["scores"].all()
     
     def create_score(self, score_data: Dict) -> Dict:
         """Crée un nouveau score"""
-        score_data["id"] = self._get_next_id("scores")
-        self.data["scores"].append(score_data)
-        self._save_data()
+        with self.transaction():
+            score_data["id"] = self._get_next_id("scores")
+            self._commit([["ins", "scores", score_data]])
         return score_data
     
     # === MÉTHODES POUR LES PARAMÈTRES ===
     def get_parametres(self) -> Dict:
         """Récupère tous les paramètres"""
-        parametres = self.data.get("parametres", {})
-        
-        # Si parametres est une liste, la convertir en dictionnaire
-        if isinstance(parametres, list):
-            params_dict = {}
-            for param in parametres:
-                if isinstance(param, dict) and "cle" in param and "valeur" in param:
-                    params_dict[param["cle"]] = param["valeur"]
-            return params_dict
-        
-        return parametres
+        return self.data.get("parametres", {})
+    
+    def get_config_version(self) -> int:
+        """Version de la configuration, incrémentée à chaque changement ou rechargement"""
+        return self._config_version
     
-    def get_parametre(self, key: str) -> Any:
-        """Récupère un paramètre spécifique"""
-        return self.data.get("parametres", {}).get(key)
+    def get_data_version(self, table: str) -> tuple:
+        """Version persistée d'une table ou de la configuration, plus les annulations locales"""
+        return (self.data["versions"].get(table, 0), self._rollbacks)
     
     def update_parametre(self, key: str, value: Any) -> bool:
         """Met à jour un paramètre"""
-        if "parametres" not in self.data:
-            self.data["parametres"] = []
-        
-        # Si parametres est une liste, la convertir en dictionnaire
-        if isinstance(self.data["parametres"], list):
-            params_dict = {}
-            for param in self.data["parametres"]:
-                if isinstance(param, dict) and "cle" in param and "valeur" in param:
-                    params_dict[param["cle"]] = param["valeur"]
-            self.data["parametres"] = params_dict
-        
-        # Maintenant on peut mettre à jour
-        self.data["parametres"][key] = value
-        self._save_data()
+        with self.transaction():
+            params_dict = dict(self.get_parametres())
+            params_dict[key] = value
+            self._commit([["set", "parametres", params_dict]])
         return True
     
     def update_parametres(self, params: Dict) -> bool:
         """Met à jour plusieurs paramètres"""
-        if "parametres" not in self.data:
-            self.data["parametres"] = {}
-        
-        # Si parametres est une liste, la convertir en dictionnaire
-        if isinstance(self.data["parametres"], list):
-            params_dict = {}
-            for param in self.data["parametres"]:
-                if isinstance(param, dict) and "cle" in param and "valeur" in param:
-                    params_dict[param["cle"]] = param["valeur"]
-            self.data["parametres"] = params_dict
-        
-        # Maintenant on peut mettre à jour
-        self.data["parametres"].update(params)
-        self._save_data()
+        with self.transaction():
+            params_dict = dict(self.get_parametres())
+            params_dict.update(params)
+            self._commit([["set", "parametres", params_dict]])
         return True
     
     # === MÉTHODES POUR LE BARÈME ===
@@ -318,6 +1229,11 @@ class JSONDataManager:
                 return item.get("nb_revisions", 3)
         return 3  # Valeur par défaut
     
+    def update_bareme(self, bareme: List[Dict]) -> bool:
+        """Met à jour le barème complet"""
+        self._commit([["set", "bareme", bareme]])
+        return True
+    
     # === MÉTHODES POUR LES DISPONIBILITÉS ===
     def get_disponibilites(self) -> List[Dict]:
         """Récupère les disponibilités"""
@@ -325,14 +1241,57 @@ class JSONDataManager:
     
     def update_disponibilites(self, disponibilites: List[Dict]) -> bool:
         """Met à jour les disponibilités"""
-        self.data["disponibilites"] = disponibilites
-        self._save_data()
+        self._commit([["set", "disponibilites", disponibilites]])
         return True
     
     # === MÉTHODES D'IMPORT/EXPORT ===
     def export_data(self) -> Dict:
         """Exporte toutes les données"""
-        return self.data.copy()
+        snapshot = self._snapshot()
+        snapshot.pop("versions", None)
+        return snapshot
+    
+    def iter_export(self, sections: Optional[Iterable[str]] = None, examen_id: Optional[int] = None,
+                    batch_size: int = 1000) -> Iterator[Tuple[str, Any]]:
+        """Instantané pris sous le verrou sans rien sérialiser
+        
+        Les enregistrements et les sections étant remplacés (jamais modifiés)
+        par les écritures, l'instantané retient leurs références ; seules les
+        colonnes du planning sont copiées.
+        """
+        wanted = None if sections is None else set(sections)
+        captured = []
+        with self.lock:
+            for name in RECORD_TABLES:
+                if wanted is not None and name not in wanted:
+                    continue
+                table = self.tables[name]
+                if name == "planning":
+                    captured.append((name, table.frozen(), table.export_slots(examen_id)))
+                elif examen_id is None:
+                    captured.append((name, table.all(), None))
+                elif name == "examens":
+                    captured.append((name, [record for record in [table.get(examen_id)] if record is not None], None))
+                elif name == "cours":
+                    captured.append((name, table.lookup("examen_id", examen_id), None))
+                else:
+                    cours_ids = set(self.tables["cours"].indexes["examen_id"].get(examen_id, ()))
+                    captured.append((name, [record for record in table.all() if record.get("cours_id") in cours_ids], None))
+            for key, value in self.data.items():
+                if key != "versions" and (wanted is None or key in wanted):
+                    # Les séquences sont modifiées en place : copiées
+                    captured.append((key, dict(value) if key == "sequences" else value, None))
+        return self._iter_captured(captured, batch_size)
+    
+    @staticmethod
+    def _iter_captured(captured: List[tuple], batch_size: int) -> Iterator[Tuple[str, Any]]:
+        for name, value, slots in captured:
+            if slots is not None:
+                yield name, value.iter_slots(slots, batch_size)
+            elif name in RECORD_TABLES:
+                yield name, iter(value)
+            else:
+                yield name, value
     
     def import_data(self, data: Dict) -> bool:
         """Importe des données et remplace tout"""
@@ -343,8 +1302,22 @@ class JSONDataManager:
                 if key not in data:
                     data[key] = self._load_default_data()[key]
             
-            self.data = data
-            self._save_data()
+            with self.transaction():
+                # Les séquences ne reculent jamais, même après un import
+                sequences = dict(self.data.get("sequences", {}))
+                imported_sequences = data.get("sequences")
+                if isinstance(imported_sequences, dict):
+                    for name, last_id in imported_sequences.items():
+                        sequences[name] = max(sequences.get(name, 0), int(last_id))
+                data["sequences"] = sequences
+                # Les versions continuent de croître : tout a changé
+                versions = dict(self.data.get("versions", {}))
+                for key in TABLES + ("config",):
+                    versions[key] = versions.get(key, 0) + 1
+                data["versions"] = versions
+                self.data = data
+                self._build_tables()
+                self._save_data()
             return True
         except Exception as e:
             print(f"❌ Erreur lors de l'import: {e}")
@@ -353,15 +1326,52 @@ class JSONDataManager:
     def get_stats(self) -> Dict:
         """Récupère les statistiques du système"""
         return {
-            "examens": len(self.data.get("examens", [])),
-            "cours": len(self.data.get("cours", [])),
-            "planning": len(self.data.get("planning", [])),
-            "scores": len(self.data.get("scores", [])),
+            "examens": len(self.tables["examens"]),
+            "cours": len(self.tables["cours"]),
+            "planning": len(self.tables["planning"]),
+            "scores": len(self.tables["scores"]),
             "parametres": len(self.data.get("parametres", {})),
             "bareme": len(self.data.get("bareme", [])),
             "disponibilites": len(self.data.get("disponibilites", []))
         }
 
+def create_manager() -> StorageBackend:
+    """Instancie le moteur de stockage choisi par REVISIONCAM_BACKEND (json ou sqlite)"""
+    backend = os.environ.get("REVISIONCAM_BACKEND", "json").lower()
+    if backend == "sqlite":
+        from sqlite_manager import SQLiteDataManager, migrate_json_to_sqlite
+        db_file = os.environ.get("REVISIONCAM_DB", "revisioncam.db")
+        json_file = os.environ.get("REVISIONCAM_JSON", "revisioncam.json")
+        if not os.path.exists(db_file) and os.path.exists(json_file):
+            print(f"🔁 Migration initiale de {json_file} vers {db_file}")
+            migrate_json_to_sqlite(json_file, db_file)
+        return SQLiteDataManager(db_file)
+    if backend != "json":
+        raise ValueError(f"Moteur de stockage inconnu: {backend}")
+    return JSONDataManager(os.environ.get("REVISIONCAM_JSON", "revisioncam.json"))
+
+class _LazyManager:
+    """Instance globale construite au premier accès plutôt qu'à l'import
+    
+    Importer le module (workers gunicorn, processus du pool, outils en ligne de
+    commande) ne lit ni n'écrit donc aucun fichier de données.
+    """
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance: Optional[StorageBackend] = None
+        self._lock = threading.Lock()
+    
+    def _get(self) -> StorageBackend:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+    
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
 # Instance globale du gestionnaire
-json_manager = JSONDataManager()
+json_manager = _LazyManager(create_manager)
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Cache des réponses JSON de RevisionCam
+Garde le corps déjà encodé des vues coûteuses, borné en octets et invalidé par table
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class ResponseCache:
+    """Corps de réponses déjà encodés, par URL, évincés du moins récemment utilisé
+
+    Chaque entrée retient l'ETag sous lequel elle a été calculée (il inclut les
+    versions des tables lues) : une entrée dont l'ETag ne correspond plus n'est
+    jamais servie, même si un autre processus a modifié les données. Les
+    écritures locales libèrent en plus immédiatement les entrées des tables
+    touchées (voir `invalidate_changed`).
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # clé → (ETag, versions des tables lues, corps)
+        self._entries: "OrderedDict[str, Tuple[str, Dict[str, Any], bytes]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, etag: str) -> Optional[bytes]:
+        """Corps mis en cache pour `key`, s'il a été calculé sous le même ETag"""
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: str, etag: str, versions: Dict[str, Any], body: bytes):
+        """Met en cache un corps de réponse, en évinçant les plus anciens au-delà de `max_bytes`"""
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            self._discard(key)
+            self._entries[key] = (etag, versions, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_changed(self, versions: Dict[str, Any]):
+        """Libère les entrées calculées avec une autre version de l'une des tables qu'elles lisent"""
+        with self.lock:
+            stale = [key for key, (_, read, _) in self._entries.items()
+                     if any(versions.get(table, version) != version for table, version in read.items())]
+            for key in stale:
+                self._discard(key)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Occupation et efficacité du cache"""
+        with self.lock:
+            return {"entrees": len(self._entries), "octets": self.size, "max_octets": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[2])
@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+"""
+Gestionnaire de données SQLite pour RevisionCam
+Même interface que JSONDataManager, avec de vraies tables et des index
+
+Migration ponctuelle depuis le fichier JSON :
+    python sqlite_manager.py migrate [revisioncam.json] [revisioncam.db]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+from storage_backend import StorageBackend, default_data, load_day, load_minutes
+
+# Tables d'enregistrements : colonnes indexées extraites de l'enregistrement JSON complet
+RECORD_COLUMNS = {
+    "examens": (),
+    "cours": ("examen_id",),
+    "planning": ("examen_id", "cours_id", "jalon", "date_finale", "statut"),
+    "scores": ("cours_id",),
+}
+
+# Filtre de l'export d'un examen (voir iter_export)
+EXPORT_FILTERS = {
+    "examens": "id = ?",
+    "cours": "examen_id = ?",
+    "planning": "examen_id = ?",
+    "scores": "cours_id IN (SELECT id FROM cours WHERE examen_id = ?)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS examens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cours (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    examen_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cours_examen ON cours (examen_id);
+CREATE TABLE IF NOT EXISTS planning (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    examen_id INTEGER,
+    cours_id INTEGER,
+    jalon,
+    date_finale TEXT,
+    statut TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_planning_examen ON planning (examen_id, statut);
+CREATE INDEX IF NOT EXISTS idx_planning_cours ON planning (cours_id, jalon);
+CREATE INDEX IF NOT EXISTS idx_planning_date ON planning (date_finale, statut);
+CREATE INDEX IF NOT EXISTS idx_planning_statut ON planning (statut);
+CREATE TABLE IF NOT EXISTS planning_load (
+    date_finale TEXT PRIMARY KEY,
+    nb INTEGER NOT NULL,
+    duree INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS planning_load_insert AFTER INSERT ON planning
+WHEN NEW.statut IS NOT 'Fait' AND NEW.date_finale IS NOT NULL
+BEGIN
+    INSERT INTO planning_load (date_finale, nb, duree)
+    VALUES (NEW.date_finale, 1, COALESCE(json_extract(NEW.data, '$.duree'), 0))
+    ON CONFLICT (date_finale) DO UPDATE SET nb = nb + 1, duree = duree + excluded.duree;
+END;
+CREATE TRIGGER IF NOT EXISTS planning_load_delete AFTER DELETE ON planning
+WHEN OLD.statut IS NOT 'Fait' AND OLD.date_finale IS NOT NULL
+BEGIN
+    UPDATE planning_load SET nb = nb - 1, duree = duree - COALESCE(json_extract(OLD.data, '$.duree'), 0)
+    WHERE date_finale = OLD.date_finale;
+    DELETE FROM planning_load WHERE date_finale = OLD.date_finale AND nb <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS planning_load_update AFTER UPDATE ON planning
+BEGIN
+    UPDATE planning_load SET nb = nb - 1, duree = duree - COALESCE(json_extract(OLD.data, '$.duree'), 0)
+    WHERE date_finale = OLD.date_finale AND OLD.statut IS NOT 'Fait';
+    DELETE FROM planning_load WHERE date_finale = OLD.date_finale AND nb <= 0;
+    INSERT INTO planning_load (date_finale, nb, duree)
+    SELECT NEW.date_finale, 1, COALESCE(json_extract(NEW.data, '$.duree'), 0)
+    WHERE NEW.statut IS NOT 'Fait' AND NEW.date_finale IS NOT NULL
+    ON CONFLICT (date_finale) DO UPDATE SET nb = nb + 1, duree = duree + excluded.duree;
+END;
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cours_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_cours ON scores (cours_id);
+CREATE TABLE IF NOT EXISTS parametres (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bareme (
+    position INTEGER PRIMARY KEY,
+    indice INTEGER,
+    nb_revisions INTEGER
+);
+CREATE TABLE IF NOT EXISTS disponibilites (
+    position INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sections (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS versions (
+    cle TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+class SQLiteDataManager(StorageBackend):
+    """Gestionnaire de données SQLite avec verrouillage thread-safe
+
+    Chaque enregistrement est conservé tel quel (colonne `data`, JSON) ; les
+    champs utilisés pour filtrer sont recopiés dans des colonnes indexées.
+    Les ids sont attribués par AUTOINCREMENT et ne sont donc jamais réutilisés.
+    """
+
+    def __init__(self, db_file: str = "revisioncam.db"):
+        self.db_file = db_file
+        self.lock = threading.RLock()
+        self._depth = 0
+        self._rollbacks = 0
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        # INSERT OR REPLACE doit déclencher les triggers de suppression (planning_load)
+        self.conn.execute("PRAGMA recursive_triggers=ON")
+        self.conn.executescript(SCHEMA)
+        self._rebuild_daily_load()
+        if not self.get_bareme() and not self.get_parametres():
+            self._write_defaults()
+        print(f"✅ Base SQLite ouverte: {self.db_file}")
+
+    def _write_defaults(self):
+        """Initialise paramètres, barème et disponibilités par défaut"""
+        defaults = default_data()
+        with self.transaction():
+            self.update_parametres(defaults["parametres"])
+            self.update_bareme(defaults["bareme"])
+            self.update_disponibilites(defaults["disponibilites"])
+
+    def _rebuild_daily_load(self):
+        """Recalcule la charge par date (tenue à jour ensuite par les triggers)"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM planning_load")
+            self.conn.execute(
+                "INSERT INTO planning_load (date_finale, nb, duree) "
+                "SELECT date_finale, COUNT(*), COALESCE(SUM(json_extract(data, '$.duree')), 0) FROM planning "
+                "WHERE statut IS NOT 'Fait' AND date_finale IS NOT NULL GROUP BY date_finale"
+            )
+
+    # === TRANSACTIONS ===
+    @contextmanager
+    def transaction(self):
+        """Regroupe les mutations du bloc dans une transaction SQLite (BEGIN IMMEDIATE)"""
+        with self.lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self
+                finally:
+                    self._depth -= 1
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield self
+            except BaseException:
+                self._depth = 0
+                self._rollbacks += 1
+                self.conn.execute("ROLLBACK")
+                raise
+            self._depth = 0
+            self.conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        """Exécute une requête et décode la colonne `data` de chaque ligne"""
+        with self.lock:
+            return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def _query_one(self, sql: str, params: tuple = ()) -> Optional[Dict]:
+        rows = self._query(sql, params)
+        return rows[0] if rows else None
+
+    def _bump_version(self, cle: str):
+        """Incrémente un compteur de version (dans une transaction)"""
+        self.conn.execute(
+            "INSERT INTO versions (cle, version) VALUES (?, 1) "
+            "ON CONFLICT (cle) DO UPDATE SET version = version + 1",
+            (cle,),
+        )
+
+    def _allocate_ids(self, table: str, count: int) -> int:
+        """Réserve `count` ids consécutifs et renvoie le premier (dans une transaction)"""
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        first_id = (row[0] if row else 0) + 1
+        if count:
+            self._bump_sequence(table, first_id + count - 1)
+        return first_id
+
+    def _bump_sequence(self, table: str, last_id: int):
+        """Avance la séquence d'une table sans jamais la faire reculer"""
+        updated = self.conn.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (last_id, table)
+        ).rowcount
+        if not updated:
+            self.conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, last_id))
+
+    def _write_record(self, table: str, record: Dict):
+        """Insère ou remplace un enregistrement (son id doit être renseigné)"""
+        columns = RECORD_COLUMNS[table]
+        values = [record["id"]] + [record.get(column) for column in columns]
+        values.append(json.dumps(record, ensure_ascii=False))
+        names = ", ".join(("id",) + columns + ("data",))
+        placeholders = ", ".join("?" * len(values))
+        self.conn.execute(f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({placeholders})", values)
+
+    def _insert_records(self, table: str, records: List[Dict]) -> List[Dict]:
+        with self.transaction():
+            first_id = self._allocate_ids(table, len(records))
+            for offset, record in enumerate(records):
+                record["id"] = first_id + offset
+                self._write_record(table, record)
+            if records:
+                self._bump_version(table)
+        return records
+
+    def _update_record(self, table: str, record_id: int, record: Dict) -> bool:
+        with self.transaction():
+            exists = self.conn.execute(f"SELECT 1 FROM {table} WHERE id = ?", (record_id,)).fetchone()
+            if not exists:
+                return False
+            record["id"] = record_id
+            self._write_record(table, record)
+            self._bump_version(table)
+        return True
+
+    # === MÉTHODES POUR LES EXAMENS ===
+    def get_examens(self) -> List[Dict]:
+        """Récupère tous les examens"""
+        return self._query("SELECT data FROM examens ORDER BY id")
+
+    def get_examen(self, exam_id: int) -> Optional[Dict]:
+        """Récupère un examen par ID"""
+        return self._query_one("SELECT data FROM examens WHERE id = ?", (exam_id,))
+
+    def create_examen(self, exam_data: Dict) -> Dict:
+        """Crée un nouvel examen"""
+        return self._insert_records("examens", [exam_data])[0]
+
+    def update_examen(self, exam_id: int, exam_data: Dict) -> bool:
+        """Met à jour un examen"""
+        return self._update_record("examens", exam_id, exam_data)
+
+    def delete_examen(self, exam_id: int) -> bool:
+        """Supprime un examen et ses données liées"""
+        with self.transaction():
+            self.conn.execute(
+                "DELETE FROM scores WHERE cours_id IN (SELECT id FROM cours WHERE examen_id = ?)", (exam_id,)
+            )
+            self.conn.execute("DELETE FROM planning WHERE examen_id = ?", (exam_id,))
+            self.conn.execute("DELETE FROM cours WHERE examen_id = ?", (exam_id,))
+            self.conn.execute("DELETE FROM examens WHERE id = ?", (exam_id,))
+            for table in RECORD_COLUMNS:
+                self._bump_version(table)
+        return True
+
+    # === MÉTHODES POUR LES COURS ===
+    def get_cours(self, examen_id: Optional[int] = None) -> List[Dict]:
+        """Récupère tous les cours ou ceux d'un examen spécifique"""
+        if examen_id is not None:
+            return self._query("SELECT data FROM cours WHERE examen_id = ? ORDER BY id", (examen_id,))
+        return self._query("SELECT data FROM cours ORDER BY id")
+
+    def get_cours_by_id(self, cours_id: int) -> Optional[Dict]:
+        """Récupère un cours par ID"""
+        return self._query_one("SELECT data FROM cours WHERE id = ?", (cours_id,))
+
+    def create_cours(self, cours_data: Dict) -> Dict:
+        """Crée un nouveau cours"""
+        return self._insert_records("cours", [cours_data])[0]
+
+    def update_cours(self, cours_id: int, cours_data: Dict) -> bool:
+        """Met à jour un cours"""
+        return self._update_record("cours", cours_id, cours_data)
+
+    def delete_cours(self, cours_id: int) -> bool:
+        """Supprime un cours et ses données liées"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM scores WHERE cours_id = ?", (cours_id,))
+            self.conn.execute("DELETE FROM planning WHERE cours_id = ?", (cours_id,))
+            self.conn.execute("DELETE FROM cours WHERE id = ?", (cours_id,))
+            for table in ("scores", "planning", "cours"):
+                self._bump_version(table)
+        return True
+
+    # === MÉTHODES POUR LE PLANNING ===
+    def get_planning(self, examen_id: Optional[int] = None) -> List[Dict]:
+        """Récupère le planning, optionnellement filtré par examen"""
+        if examen_id is not None:
+            return self._query("SELECT data FROM planning WHERE examen_id = ? ORDER BY id", (examen_id,))
+        return self._query("SELECT data FROM planning ORDER BY id")
+
+    def get_planning_page(self, examen_id: Optional[int] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None, statut: Optional[str] = None,
+                          after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Page du planning filtrée et bornée par SQLite (colonnes indexées, ordre des ids)"""
+        clauses, params = [], []
+        for clause, value in (("examen_id = ?", examen_id), ("date_finale >= ?", date_from),
+                              ("date_finale <= ?", date_to), ("statut = ?", statut), ("id > ?", after_id)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT data FROM planning"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def get_planning_by_course(self, cours_id: int, jalon_min: Optional[int] = None,
+                               statut: Optional[str] = None) -> List[Dict]:
+        """Récupère le planning d'un cours, optionnellement après un jalon et pour un statut"""
+        sql = "SELECT data FROM planning WHERE cours_id = ?"
+        params: list = [cours_id]
+        if jalon_min is not None:
+            sql += " AND jalon > ?"
+            params.append(jalon_min)
+        if statut is not None:
+            sql += " AND statut = ?"
+            params.append(statut)
+        return self._query(sql + " ORDER BY id", tuple(params))
+
+    def get_planning_by_date(self, date_finale: str, exclude_statut: Optional[str] = "Fait") -> List[Dict]:
+        """Récupère les éléments d'une date (par défaut ceux qui ne sont pas 'Fait')"""
+        if exclude_statut is None:
+            return self._query("SELECT data FROM planning WHERE date_finale = ? ORDER BY id", (date_finale,))
+        return self._query(
+            "SELECT data FROM planning WHERE date_finale = ? AND statut IS NOT ? ORDER BY id",
+            (date_finale, exclude_statut),
+        )
+
+    def get_planning_by_statut(self, statut: str) -> List[Dict]:
+        """Récupère les éléments de planning ayant un statut donné"""
+        return self._query("SELECT data FROM planning WHERE statut = ? ORDER BY id", (statut,))
+
+    def get_pending_planning(self) -> List[Dict]:
+        """Récupère les éléments de planning qui ne sont pas 'Fait'"""
+        return self._query("SELECT data FROM planning WHERE statut IS NOT 'Fait' ORDER BY id")
+
+    def get_pending_occupancy(self) -> List[tuple]:
+        """Occupation des éléments non 'Fait', lue dans les colonnes sans décoder `data`"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, cours_id, examen_id, date_finale, COALESCE(json_extract(data, '$.duree'), 0) "
+                "FROM planning WHERE statut IS NOT 'Fait' ORDER BY id"
+            ).fetchall()
+        return [(record_id, cours_id, examen_id, load_day(date_key), load_minutes(duree))
+                for record_id, cours_id, examen_id, date_key, duree in rows]
+
+    def get_daily_load(self) -> Dict[int, Dict[str, int]]:
+        """Récupère la charge par jour (ordinal) des éléments non 'Fait' (ordre chronologique)"""
+        with self.lock:
+            rows = self.conn.execute("SELECT date_finale, nb, duree FROM planning_load ORDER BY date_finale").fetchall()
+        # Les dates non ISO ne comptent dans la charge d'aucun jour
+        return {load_day(date_key): {"count": count, "duration": load_minutes(duration)}
+                for date_key, count, duration in rows if load_day(date_key) is not None}
+
+    def find_planning_item(self, cours_id: int, jalon: Any) -> Optional[Dict]:
+        """Récupère le premier élément de planning d'un cours pour un jalon"""
+        return self._query_one(
+            "SELECT data FROM planning WHERE cours_id = ? AND jalon = ? ORDER BY id LIMIT 1", (cours_id, jalon)
+        )
+
+    def create_planning_item(self, planning_data: Dict) -> Dict:
+        """Crée un nouvel élément de planning"""
+        return self._insert_records("planning", [planning_data])[0]
+
+    def create_planning_items(self, items: List[Dict]) -> List[Dict]:
+        """Crée plusieurs éléments de planning en une seule écriture"""
+        return self._insert_records("planning", items)
+
+    def replace_planning_for_exam(self, examen_id: int, items: List[Dict], keep_status: str = None) -> List[Dict]:
+        """Remplace le planning d'un examen (sauf le statut conservé) en une seule écriture"""
+        with self.transaction():
+            self.clear_planning_for_exam(examen_id, keep_status)
+            self._insert_records("planning", items)
+        return items
+
+    def update_planning_item(self, planning_id: int, planning_data: Dict) -> bool:
+        """Met à jour un élément de planning"""
+        return self._update_record("planning", planning_id, planning_data)
+
+    def delete_planning_item(self, planning_id: int) -> bool:
+        """Supprime un élément de planning"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM planning WHERE id = ?", (planning_id,))
+            self._bump_version("planning")
+        return True
+
+    def clear_planning_for_exam(self, examen_id: int, keep_status: str = None):
+        """Supprime le planning d'un examen, optionnellement en gardant certains statuts"""
+        with self.transaction():
+            if keep_status:
+                self.conn.execute(
+                    "DELETE FROM planning WHERE examen_id = ? AND statut IS NOT ?", (examen_id, keep_status)
+                )
+            else:
+                self.conn.execute("DELETE FROM planning WHERE examen_id = ?", (examen_id,))
+            self._bump_version("planning")
+
+    # === MÉTHODES POUR LES SCORES ===
+    def get_scores(self, cours_id: Optional[int] = None) -> List[Dict]:
+        """Récupère tous les scores ou ceux d'un cours spécifique"""
+        if cours_id is not None:
+            return self._query("SELECT data FROM scores WHERE cours_id = ? ORDER BY id", (cours_id,))
+        return self._query("SELECT data FROM scores ORDER BY id")
+
+    def create_score(self, score_data: Dict) -> Dict:
+        """Crée un nouveau score"""
+        return self._insert_records("scores", [score_data])[0]
+
+    # === MÉTHODES POUR LES PARAMÈTRES ===
+    def get_parametres(self) -> Dict:
+        """Récupère tous les paramètres"""
+        with self.lock:
+            rows = self.conn.execute("SELECT cle, valeur FROM parametres ORDER BY rowid").fetchall()
+        return {cle: json.loads(valeur) for cle, valeur in rows}
+
+    def get_config_version(self) -> tuple:
+        """Version de la configuration (compteur en base, plus les annulations locales)"""
+        with self.lock:
+            row = self.conn.execute("SELECT version FROM versions WHERE cle = 'config'").fetchone()
+        # Une transaction annulée peut avoir été lue avec une version qui sera réattribuée
+        return (row[0] if row else 0, self._rollbacks)
+
+    def get_data_version(self, table: str) -> tuple:
+        """Version d'une table ou de la configuration (compteur en base, plus les annulations locales)"""
+        with self.lock:
+            row = self.conn.execute("SELECT version FROM versions WHERE cle = ?", (table,)).fetchone()
+        return (row[0] if row else 0, self._rollbacks)
+
+    def update_parametre(self, key: str, value: Any) -> bool:
+        """Met à jour un paramètre"""
+        return self.update_parametres({key: value})
+
+    def update_parametres(self, params: Dict) -> bool:
+        """Met à jour plusieurs paramètres"""
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT INTO parametres (cle, valeur) VALUES (?, ?) "
+                "ON CONFLICT (cle) DO UPDATE SET valeur = excluded.valeur",
+                [(key, json.dumps(value, ensure_ascii=False)) for key, value in params.items()],
+            )
+            self._bump_version("config")
+        return True
+
+    # === MÉTHODES POUR LE BARÈME ===
+    def get_bareme(self) -> List[Dict]:
+        """Récupère le barème"""
+        with self.lock:
+            rows = self.conn.execute("SELECT indice, nb_revisions FROM bareme ORDER BY position").fetchall()
+        return [{"indice": indice, "nb_revisions": nb_revisions} for indice, nb_revisions in rows]
+
+    def update_bareme(self, bareme: List[Dict]) -> bool:
+        """Met à jour le barème complet"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM bareme")
+            self.conn.executemany(
+                "INSERT INTO bareme (position, indice, nb_revisions) VALUES (?, ?, ?)",
+                [(position, item.get("indice"), item.get("nb_revisions")) for position, item in enumerate(bareme)],
+            )
+            self._bump_version("config")
+        return True
+
+    # === MÉTHODES POUR LES DISPONIBILITÉS ===
+    def get_disponibilites(self) -> List[Dict]:
+        """Récupère les disponibilités"""
+        return self._query("SELECT data FROM disponibilites ORDER BY position")
+
+    def update_disponibilites(self, disponibilites: List[Dict]) -> bool:
+        """Met à jour les disponibilités"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM disponibilites")
+            self.conn.executemany(
+                "INSERT INTO disponibilites (position, data) VALUES (?, ?)",
+                [(position, json.dumps(item, ensure_ascii=False)) for position, item in enumerate(disponibilites)],
+            )
+            self._bump_version("config")
+        return True
+
+    # === MÉTHODES D'IMPORT/EXPORT ===
+    def export_data(self) -> Dict:
+        """Exporte toutes les données au format du fichier revisioncam.json"""
+        with self.transaction():
+            data: Dict[str, Any] = {
+                "examens": self.get_examens(),
+                "cours": self.get_cours(),
+                "planning": self.get_planning(),
+                "scores": self.get_scores(),
+            }
+            data.update(self._read_sections(self.conn))
+        return data
+
+    def iter_export(self, sections: Optional[Iterable[str]] = None, examen_id: Optional[int] = None,
+                    batch_size: int = 1000) -> Iterator[Tuple[str, Any]]:
+        """Instantané lu sur une connexion dédiée, dans une transaction de lecture
+
+        En mode WAL, la transaction voit la base telle qu'à sa première lecture
+        sans bloquer les écritures ; la connexion est fermée en fin de parcours.
+        """
+        wanted = None if sections is None else set(sections)
+        conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("BEGIN")
+            other_sections = self._read_sections(conn)
+        except BaseException:
+            conn.close()
+            raise
+        return self._iter_snapshot(conn, wanted, other_sections, examen_id, batch_size)
+
+    @staticmethod
+    def _iter_snapshot(conn: sqlite3.Connection, wanted: Optional[set], other_sections: Dict[str, Any],
+                       examen_id: Optional[int], batch_size: int) -> Iterator[Tuple[str, Any]]:
+        try:
+            for table in RECORD_COLUMNS:
+                if wanted is None or table in wanted:
+                    if examen_id is None:
+                        cursor = conn.execute(f"SELECT data FROM {table} ORDER BY id")
+                    else:
+                        cursor = conn.execute(f"SELECT data FROM {table} WHERE {EXPORT_FILTERS[table]} ORDER BY id",
+                                              (examen_id,))
+                    yield table, (json.loads(row[0]) for rows in iter(lambda: cursor.fetchmany(batch_size), [])
+                                  for row in rows)
+            for cle, valeur in other_sections.items():
+                if wanted is None or cle in wanted:
+                    yield cle, valeur
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _read_sections(conn: sqlite3.Connection) -> Dict[str, Any]:
+        """Sections hors tables d'enregistrements, dans l'ordre du fichier revisioncam.json"""
+        data: Dict[str, Any] = {
+            "parametres": {cle: json.loads(valeur)
+                           for cle, valeur in conn.execute("SELECT cle, valeur FROM parametres ORDER BY rowid")},
+            "bareme": [{"indice": indice, "nb_revisions": nb_revisions}
+                       for indice, nb_revisions in conn.execute("SELECT indice, nb_revisions FROM bareme ORDER BY position")],
+            "disponibilites": [json.loads(row[0])
+                               for row in conn.execute("SELECT data FROM disponibilites ORDER BY position")],
+        }
+        for cle, valeur in conn.execute("SELECT cle, valeur FROM sections ORDER BY rowid"):
+            data[cle] = json.loads(valeur)
+        data["sequences"] = {
+            name: seq for name, seq in conn.execute("SELECT name, seq FROM sqlite_sequence")
+            if name in RECORD_COLUMNS
+        }
+        return data
+
+    def import_data(self, data: Dict) -> bool:
+        """Importe des données et remplace tout"""
+        try:
+            with self.transaction():
+                for table in RECORD_COLUMNS:
+                    self.conn.execute(f"DELETE FROM {table}")
+                    self._bump_version(table)
+                    records = data.get(table) or []
+                    seen = set()
+                    orphans = []
+                    for record in records:
+                        if isinstance(record.get("id"), int) and record["id"] not in seen:
+                            seen.add(record["id"])
+                            self._write_record(table, record)
+                        else:
+                            orphans.append(record)
+                    if seen:
+                        self._bump_sequence(table, max(seen))
+                    for record in orphans:
+                        record["id"] = self._allocate_ids(table, 1)
+                        self._write_record(table, record)
+                # Les séquences ne reculent jamais, même après un import
+                for table, last_id in (data.get("sequences") or {}).items():
+                    if table in RECORD_COLUMNS:
+                        self._bump_sequence(table, int(last_id))
+
+                parametres = data.get("parametres")
+                if isinstance(parametres, list):
+                    parametres = {p["cle"]: p["valeur"] for p in parametres
+                                  if isinstance(p, dict) and "cle" in p and "valeur" in p}
+                self.conn.execute("DELETE FROM parametres")
+                self._bump_version("config")
+                if parametres:
+                    self.update_parametres(parametres)
+                if "bareme" in data:
+                    self.update_bareme(data["bareme"])
+                if "disponibilites" in data:
+                    self.update_disponibilites(data["disponibilites"])
+
+                self.conn.execute("DELETE FROM sections")
+                known = set(RECORD_COLUMNS) | {"parametres", "bareme", "disponibilites", "sequences", "versions"}
+                self.conn.executemany(
+                    "INSERT INTO sections (cle, valeur) VALUES (?, ?)",
+                    [(cle, json.dumps(valeur, ensure_ascii=False)) for cle, valeur in data.items() if cle not in known],
+                )
+            return True
+        except Exception as e:
+            print(f"❌ Erreur lors de l'import: {e}")
+            return False
+
+    def get_stats(self) -> Dict:
+        """Récupère les statistiques du système"""
+        with self.lock:
+            count = lambda table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            return {
+                "examens": count("examens"),
+                "cours": count("cours"),
+                "planning": count("planning"),
+                "scores": count("scores"),
+                "parametres": count("parametres"),
+                "bareme": count("bareme"),
+                "disponibilites": count("disponibilites"),
+            }
+
+def migrate_json_to_sqlite(json_file: str = "revisioncam.json", db_file: str = "revisioncam.db") -> Dict:
+    """Migre le fichier JSON (et son journal éventuel) vers une base SQLite"""
+    from json_manager import JSONDataManager
+    if not os.path.exists(json_file):
+        raise FileNotFoundError(json_file)
+    source = JSONDataManager(json_file)
+    target = SQLiteDataManager(db_file)
+    if not target.import_data(source.export_data()):
+        raise RuntimeError(f"Échec de l'import dans {db_file}")
+    stats = target.get_stats()
+    print(f"✅ Migration {json_file} → {db_file} terminée: {stats}")
+    return stats
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python sqlite_manager.py migrate [revisioncam.json] [revisioncam.db]")
+        sys.exit(1)
+    migrate_json_to_sqlite(*sys.argv[2:4])
@@ -51,4 +51,8 @@ print('✅ Données initialisées')
 "
 
 echo "🌐 Démarrage du serveur..."
+# Plusieurs workers partagent revisioncam.json : activer le verrouillage inter-processus
+export REVISIONCAM_SHARED=1
+# Démarrage des workers depuis l'instantané binaire plutôt qu'en analysant le JSON
+export REVISIONCAM_SNAPSHOT=1
 gunicorn app_flask_json:app --bind 0.0.0.0:$PORT --workers 2 --timeout 120
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Interface commune des moteurs de stockage de RevisionCam
+L'application ne dépend que de ces méthodes, quel que soit le moteur actif
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+# Tables d'enregistrements (objets à id), dans l'ordre du fichier revisioncam.json
+RECORD_TABLES = ("examens", "cours", "planning", "scores")
+
+# === DATES ===
+# Les enregistrements gardent leurs dates au format ISO ('%Y-%m-%d') ; les index
+# et les algorithmes de planning travaillent sur des ordinaux de jour
+# (`date.toordinal()`), convertis une seule fois à la frontière.
+
+@lru_cache(maxsize=8192)
+def iso_to_ordinal(value: str) -> int:
+    """Convertit une date ISO en ordinal de jour"""
+    return datetime.strptime(value, '%Y-%m-%d').toordinal()
+
+@lru_cache(maxsize=8192)
+def ordinal_to_iso(ordinal: int) -> str:
+    """Convertit un ordinal de jour en date ISO"""
+    return date.fromordinal(ordinal).isoformat()
+
+def weekday(ordinal: int) -> int:
+    """Jour de la semaine d'un ordinal (0 = lundi)"""
+    return (ordinal - 1) % 7
+
+def today_ordinal() -> int:
+    """Ordinal du jour courant"""
+    return date.today().toordinal()
+
+def date_in_range(value: Any, day_from: Optional[int] = None, day_to: Optional[int] = None) -> bool:
+    """La date ISO `value` tombe entre deux ordinaux inclus (bornes facultatives, date invalide exclue)"""
+    if day_from is None and day_to is None:
+        return True
+    try:
+        day = iso_to_ordinal(value)
+    except (TypeError, ValueError):
+        return False
+    return (day_from is None or day >= day_from) and (day_to is None or day <= day_to)
+
+def load_day(value: Any) -> Optional[int]:
+    """Ordinal d'une date comptée dans la charge d'un jour (None si absente ou non ISO)"""
+    try:
+        return iso_to_ordinal(value)
+    except (TypeError, ValueError):
+        return None
+
+def load_minutes(value: Any) -> int:
+    """Durée comptée dans la charge d'un jour (0 si elle n'est pas un nombre entier)"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def default_data() -> Dict[str, Any]:
+    """Structure par défaut des données (sections et valeurs initiales)"""
+    return {
+        "examens": [],
+        "cours": [],
+        "planning": [],
+        "scores": [],
+        "parametres": {
+            "duree_min": 30,
+            "duree_max": 60,
+            "nb_max_par_j": 4,
+            "nb_min_par_j": 1,
+            "bonus_ok": 2,
+            "bonus_fail": 1,
+            "seuil_ok": 85,
+            "seuil_fail": 60,
+            "temps_pause": 15
+        },
+        "bareme": [
+            {"indice": 0, "nb_revisions": 1},
+            {"indice": 1, "nb_revisions": 2},
+            {"indice": 2, "nb_revisions": 3},
+            {"indice": 3, "nb_revisions": 4},
+            {"indice": 4, "nb_revisions": 5},
+            {"indice": 5, "nb_revisions": 6},
+            {"indice": 6, "nb_revisions": 7},
+            {"indice": 7, "nb_revisions": 8},
+            {"indice": 8, "nb_revisions": 9},
+            {"indice": 9, "nb_revisions": 10},
+            {"indice": 10, "nb_revisions": 11}
+        ],
+        "disponibilites": [
+            {"jour": "lundi", "minutes": 480},
+            {"jour": "mardi", "minutes": 480},
+            {"jour": "mercredi", "minutes": 480},
+            {"jour": "jeudi", "minutes": 480},
+            {"jour": "vendredi", "minutes": 480},
+            {"jour": "samedi", "minutes": 300},
+            {"jour": "dimanche", "minutes": 240}
+        ],
+        "sequences": {}
+    }
+
+class StorageBackend(ABC):
+    """Surface de données utilisée par app_flask_json.py
+
+    Implémentations : `JSONDataManager` (fichier JSON unique, json_manager.py)
+    et `SQLiteDataManager` (tables et index SQLite, sqlite_manager.py).
+    Les enregistrements sont échangés sous forme de dictionnaires ; les méthodes
+    `update_*` reçoivent l'enregistrement complet.
+    """
+
+    # === TRANSACTIONS ET COHÉRENCE ===
+    @contextmanager
+    def transaction(self):
+        """Regroupe les mutations du bloc en une seule écriture (annulées en cas d'exception)"""
+        yield self
+
+    def refresh(self) -> bool:
+        """Intègre les écritures d'autres processus ; renvoie True si les données ont changé"""
+        return False
+
+    @abstractmethod
+    def get_data_version(self, table: str) -> Any:
+        """Version d'une table (`examens`, `cours`, `planning`, `scores`) ou de la configuration (`config`)
+
+        Croît à chaque modification et vaut la même chose dans tous les
+        processus pour un même état : sert à construire les ETag.
+        """
+
+    # === EXAMENS ===
+    @abstractmethod
+    def get_examens(self) -> List[Dict]:
+        """Récupère tous les examens"""
+
+    @abstractmethod
+    def get_examen(self, exam_id: int) -> Optional[Dict]:
+        """Récupère un examen par ID"""
+
+    @abstractmethod
+    def create_examen(self, exam_data: Dict) -> Dict:
+        """Crée un nouvel examen"""
+
+    @abstractmethod
+    def update_examen(self, exam_id: int, exam_data: Dict) -> bool:
+        """Met à jour un examen"""
+
+    @abstractmethod
+    def delete_examen(self, exam_id: int) -> bool:
+        """Supprime un examen et ses données liées"""
+
+    # === COURS ===
+    @abstractmethod
+    def get_cours(self, examen_id: Optional[int] = None) -> List[Dict]:
+        """Récupère tous les cours ou ceux d'un examen spécifique"""
+
+    @abstractmethod
+    def get_cours_by_id(self, cours_id: int) -> Optional[Dict]:
+        """Récupère un cours par ID"""
+
+    @abstractmethod
+    def create_cours(self, cours_data: Dict) -> Dict:
+        """Crée un nouveau cours"""
+
+    @abstractmethod
+    def update_cours(self, cours_id: int, cours_data: Dict) -> bool:
+        """Met à jour un cours"""
+
+    @abstractmethod
+    def delete_cours(self, cours_id: int) -> bool:
+        """Supprime un cours et ses données liées"""
+
+    # === PLANNING ===
+    @abstractmethod
+    def get_planning(self, examen_id: Optional[int] = None) -> List[Dict]:
+        """Récupère le planning, optionnellement filtré par examen"""
+
+    @abstractmethod
+    def get_planning_page(self, examen_id: Optional[int] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None, statut: Optional[str] = None,
+                          after_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Récupère une page du planning filtrée par examen, par dates ISO incluses et par statut
+
+        Sans `after_id` ni `limit`, l'ordre est celui de `get_planning` ; sinon
+        les éléments suivent l'ordre des ids, à partir du premier id supérieur
+        à `after_id` et au plus `limit`. Seule la page est lue en entier.
+        """
+
+    @abstractmethod
+    def get_planning_by_course(self, cours_id: int, jalon_min: Optional[int] = None,
+                               statut: Optional[str] = None) -> List[Dict]:
+        """Récupère le planning d'un cours, optionnellement après un jalon et pour un statut"""
+
+    @abstractmethod
+    def get_planning_by_date(self, date_finale: str, exclude_statut: Optional[str] = "Fait") -> List[Dict]:
+        """Récupère les éléments d'une date (par défaut ceux qui ne sont pas 'Fait')"""
+
+    @abstractmethod
+    def get_planning_by_statut(self, statut: str) -> List[Dict]:
+        """Récupère les éléments de planning ayant un statut donné"""
+
+    @abstractmethod
+    def get_pending_planning(self) -> List[Dict]:
+        """Récupère les éléments de planning qui ne sont pas 'Fait' (dans l'ordre du planning)"""
+
+    @abstractmethod
+    def get_pending_occupancy(self) -> List[tuple]:
+        """Occupation des éléments non 'Fait' : (id, cours_id, examen_id, jour ordinal, durée), dans l'ordre du planning
+
+        Le jour et la durée suivent `load_day` et `load_minutes` : None pour une
+        date absente ou non ISO, 0 pour une durée qui n'est pas un nombre.
+        """
+
+    @abstractmethod
+    def get_daily_load(self) -> Dict[int, Dict[str, int]]:
+        """Récupère la charge par jour des éléments non 'Fait' : {ordinal: {'count', 'duration'}}"""
+
+    @abstractmethod
+    def find_planning_item(self, cours_id: int, jalon: Any) -> Optional[Dict]:
+        """Récupère le premier élément de planning d'un cours pour un jalon"""
+
+    @abstractmethod
+    def create_planning_item(self, planning_data: Dict) -> Dict:
+        """Crée un nouvel élément de planning"""
+
+    @abstractmethod
+    def create_planning_items(self, items: List[Dict]) -> List[Dict]:
+        """Crée plusieurs éléments de planning en une seule écriture"""
+
+    @abstractmethod
+    def replace_planning_for_exam(self, examen_id: int, items: List[Dict], keep_status: str = None) -> List[Dict]:
+        """Remplace le planning d'un examen (sauf le statut conservé) en une seule écriture"""
+
+    @abstractmethod
+    def update_planning_item(self, planning_id: int, planning_data: Dict) -> bool:
+        """Met à jour un élément de planning"""
+
+    @abstractmethod
+    def delete_planning_item(self, planning_id: int) -> bool:
+        """Supprime un élément de planning"""
+
+    @abstractmethod
+    def clear_planning_for_exam(self, examen_id: int, keep_status: str = None):
+        """Supprime le planning d'un examen, optionnellement en gardant certains statuts"""
+
+    # === SCORES ===
+    @abstractmethod
+    def get_scores(self, cours_id: Optional[int] = None) -> List[Dict]:
+        """Récupère tous les scores ou ceux d'un cours spécifique"""
+
+    @abstractmethod
+    def create_score(self, score_data: Dict) -> Dict:
+        """Crée un nouveau score"""
+
+    # === PARAMÈTRES, BARÈME ET DISPONIBILITÉS ===
+    @abstractmethod
+    def get_parametres(self) -> Dict:
+        """Récupère tous les paramètres sous forme de dictionnaire"""
+
+    def get_parametre(self, key: str) -> Any:
+        """Récupère un paramètre spécifique"""
+        return self.get_parametres().get(key)
+
+    @abstractmethod
+    def get_config_version(self) -> Any:
+        """Version des paramètres, du barème et des disponibilités
+
+        Change à chaque modification de l'une de ces sections, y compris par un
+        autre processus : permet de garder en cache ce qui en est dérivé.
+        """
+
+    @abstractmethod
+    def update_parametre(self, key: str, value: Any) -> bool:
+        """Met à jour un paramètre"""
+
+    @abstractmethod
+    def update_parametres(self, params: Dict) -> bool:
+        """Met à jour plusieurs paramètres"""
+
+    @abstractmethod
+    def get_bareme(self) -> List[Dict]:
+        """Récupère le barème"""
+
+    def get_nb_revisions(self, indice: int) -> int:
+        """Récupère le nombre de révisions pour un indice donné"""
+        indice = max(0, min(10, int(indice) if indice is not None else 5))
+        for item in self.get_bareme():
+            if item.get("indice") == indice:
+                return item.get("nb_revisions", 3)
+        return 3  # Valeur par défaut
+
+    @abstractmethod
+    def update_bareme(self, bareme: List[Dict]) -> bool:
+        """Met à jour le barème complet"""
+
+    @abstractmethod
+    def get_disponibilites(self) -> List[Dict]:
+        """Récupère les disponibilités"""
+
+    @abstractmethod
+    def update_disponibilites(self, disponibilites: List[Dict]) -> bool:
+        """Met à jour les disponibilités"""
+
+    # === IMPORT/EXPORT ===
+    @abstractmethod
+    def export_data(self) -> Dict:
+        """Exporte toutes les données au format du fichier revisioncam.json"""
+
+    @abstractmethod
+    def iter_export(self, sections: Optional[Iterable[str]] = None, examen_id: Optional[int] = None,
+                    batch_size: int = 1000) -> Iterator[Tuple[str, Any]]:
+        """Parcourt un instantané cohérent des données, section par section
+
+        L'instantané est pris à l'appel ; le générateur renvoyé produit des
+        paires (section, valeur) dans l'ordre de `export_data`. Pour les tables
+        de `RECORD_TABLES`, la valeur est un itérateur d'enregistrements lus par
+        lots de `batch_size`, à parcourir avant de passer à la section suivante.
+        `sections` restreint l'export ; `examen_id` ne garde que l'examen, ses
+        cours, son planning et les scores de ses cours.
+        """
+
+    @abstractmethod
+    def import_data(self, data: Dict) -> bool:
+        """Importe des données et remplace tout"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict:
+        """Récupère les statistiques du système"""